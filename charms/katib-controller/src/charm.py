@@ -4,10 +4,11 @@
 
 import json
 import logging
+import re
 import tempfile
 from base64 import b64encode
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 
 import lightkube
 import yaml
@@ -18,8 +19,14 @@ from charmed_kubeflow_chisme.components.leadership_gate_component import Leaders
 from charmed_kubeflow_chisme.kubernetes import create_charm_default_labels
 from charms.grafana_k8s.v0.grafana_dashboard import GrafanaDashboardProvider
 from charms.loki_k8s.v1.loki_push_api import LogForwarder
+from charms.observability_libs.v0.kubernetes_compute_resources_patch import (
+    KubernetesComputeResourcesPatch,
+    ResourceRequirements,
+    adjust_resource_requirements,
+)
 from charms.observability_libs.v1.kubernetes_service_patch import KubernetesServicePatch
 from charms.prometheus_k8s.v0.prometheus_scrape import MetricsEndpointProvider
+from lightkube import ApiError
 from lightkube.models.core_v1 import ServicePort
 from lightkube.resources.admissionregistration_v1 import (
     MutatingWebhookConfiguration,
@@ -33,9 +40,22 @@ from ops.framework import StoredState
 from ops.main import main
 
 from certs import gen_certs
+from components.config_validation_component import ConfigValidationComponent
+from components.default_resume_policy_component import DefaultResumePolicyComponent
 from components.k8s_service_info_requirer_component import K8sServiceInfoRequirerComponent
+from components.namespace_scope_component import NamespaceScopeComponent
 from components.pebble_component import KatibControllerInputs, KatibControllerPebbleService
+from components.resources_patch_component import ResourcesPatchComponent
 from components.service_mesh_component import ServiceMeshComponent
+from components.state_metrics_component import StateMetricsComponent
+from experiment_gc import (
+    RetentionPolicy,
+    cleanup_suggestions,
+    compact_experiment_trials,
+    prune_experiments,
+)
+from profiling import capture_profile
+from scrape_config import scrape_job_settings
 
 DEFAULT_IMAGES_FILE = "src/default-custom-images.json"
 with open(DEFAULT_IMAGES_FILE, "r") as json_file:
@@ -49,10 +69,29 @@ K8S_RESOURCE_FILES = [
     "src/templates/katib-config-configmap.yaml.j2",
 ]
 
+NAMESPACE_SCOPE_FILE = Path("src/templates/namespace_scope.yaml.j2")
+DEFAULT_RESUME_POLICY_FILE = Path("src/templates/default_resume_policy.yaml.j2")
+STATE_METRICS_FILE = Path("src/templates/katib_state_metrics.yaml.j2")
+STATE_METRICS_PORT = 8080
+
 KATIB_WEBHOOK_PORT = 8443
 CERTS_FOLDER = Path("/tmp/cert")
 KATIB_CONFIG_FILE = Path("src/templates/katib-config.yaml.j2")
 KATIB_CONFIG_DESTINATION_PATH = "/katib-config/katib-config.yaml"
+METRICS_COLLECTOR_INJECTION_LABEL = {"katib.kubeflow.org/metrics-collector-injection": "enabled"}
+NAMESPACE_NAME_LABEL = "kubernetes.io/metadata.name"
+# Scheduler names of the supported gang schedulers, by gang-scheduler config value
+GANG_SCHEDULER_NAMES = {
+    "": "",
+    "scheduler-plugins": "scheduler-plugins-scheduler",
+    "volcano": "volcano",
+}
+KUEUE_QUEUE_NAME_REGEX = re.compile(r"^[a-z0-9]([-a-z0-9.]*[a-z0-9])?$")
+NAMESPACE_NAME_REGEX = re.compile(r"^[a-z0-9]([-a-z0-9]*[a-z0-9])?$")
+# Label keys (with optional DNS prefix) and label values
+LABEL_TOKEN_REGEX = re.compile(
+    r"^([a-z0-9]([-a-z0-9.]*[a-z0-9])?/)?[A-Za-z0-9]([-A-Za-z0-9_.]*[A-Za-z0-9])?$"
+)
 
 logger = logging.getLogger(__name__)
 
@@ -86,6 +125,47 @@ def parse_images_config(config: str) -> Dict:
     return images
 
 
+def parse_namespace_selector(namespaces: str, label_selector: str) -> Dict:
+    """
+    Parse the config-defined namespaces and namespace label selector.
+
+    This function takes a comma-separated list of namespace names and a comma-separated list of
+    'key=value' label requirements and returns a Kubernetes LabelSelector matching the
+    namespaces that satisfy both.
+
+    Args:
+        namespaces (str): comma-separated namespace names, may be empty.
+        label_selector (str): comma-separated 'key=value' requirements, may be empty.
+
+    Returns:
+        Dict: a LabelSelector, empty if neither input restricts the namespaces.
+
+    Raises:
+        ValueError: if a namespace name or a label requirement is malformed.
+    """
+    selector = {}
+
+    match_labels = {}
+    for requirement in filter(None, (r.strip() for r in label_selector.split(","))):
+        key, separator, value = (part.strip() for part in requirement.partition("="))
+        if not separator or not LABEL_TOKEN_REGEX.match(key) or not LABEL_TOKEN_REGEX.match(value):
+            raise ValueError(f"Invalid namespace-selector requirement '{requirement}'")
+        match_labels[key] = value
+    if match_labels:
+        selector["matchLabels"] = match_labels
+
+    names = [name.strip() for name in namespaces.split(",") if name.strip()]
+    for name in names:
+        if not NAMESPACE_NAME_REGEX.match(name):
+            raise ValueError(f"Invalid namespace name '{name}' in namespaces")
+    if names:
+        selector["matchExpressions"] = [
+            {"key": NAMESPACE_NAME_LABEL, "operator": "In", "values": names}
+        ]
+
+    return selector
+
+
 class KatibControllerOperator(CharmBase):
     """Charm for the Katib controller component."""
 
@@ -107,14 +187,13 @@ class KatibControllerOperator(CharmBase):
 
         self.prometheus_provider = MetricsEndpointProvider(
             charm=self,
-            jobs=[
-                {
-                    "job_name": "katib_controller_metrics",
-                    "static_configs": [{"targets": [f"*:{self.config['metrics-port']}"]}],
-                }
-            ],
+            jobs=self._scrape_jobs,
+            refresh_event=self.on.config_changed,
         )
         self.dashboard_provider = GrafanaDashboardProvider(self)
+        self.compute_resources_patch = KubernetesComputeResourcesPatch(
+            self, "katib-controller", resource_reqs_func=self._resource_requirements
+        )
 
         # Charm logic
         self.charm_reconciler = CharmReconciler(self)
@@ -130,6 +209,30 @@ class KatibControllerOperator(CharmBase):
             depends_on=[],
         )
 
+        self.config_validation = self.charm_reconciler.add(
+            component=ConfigValidationComponent(
+                charm=self,
+                name="config-validation",
+                validators=[
+                    self._namespace_selector,
+                    self._kueue_queue_name,
+                    self._gang_scheduler_name,
+                ],
+            ),
+            depends_on=[],
+        )
+
+        # Invalid scrape settings do not stop the reconciliation, the metrics are then scraped
+        # with the Prometheus defaults
+        self.metrics_scrape_config = self.charm_reconciler.add(
+            component=ConfigValidationComponent(
+                charm=self,
+                name="metrics-scrape-config",
+                validators=[self._scrape_job_settings],
+            ),
+            depends_on=[],
+        )
+
         self.kubernetes_resources = self.charm_reconciler.add(
             component=KubernetesComponent(
                 charm=self,
@@ -150,7 +253,18 @@ class KatibControllerOperator(CharmBase):
                 context_callable=self._kubernetes_manifests_context,
                 lightkube_client=lightkube.Client(),
             ),
-            depends_on=[self.leadership_gate],
+            depends_on=[self.leadership_gate, self.config_validation],
+        )
+
+        self.namespace_scope = self.charm_reconciler.add(
+            component=NamespaceScopeComponent(
+                charm=self,
+                name="namespace-scope",
+                template_path=NAMESPACE_SCOPE_FILE,
+                namespace_selector_getter=self._namespace_selector,
+                lightkube_client=lightkube.Client(),
+            ),
+            depends_on=[self.leadership_gate, self.config_validation],
         )
 
         # Create temporary files for the certificate data
@@ -168,6 +282,36 @@ class KatibControllerOperator(CharmBase):
             depends_on=[self.leadership_gate],
         )
 
+        self.resources_patch = self.charm_reconciler.add(
+            component=ResourcesPatchComponent(
+                charm=self,
+                name="resources-patch",
+                resources_patch=self.compute_resources_patch,
+            ),
+            depends_on=[self.leadership_gate],
+        )
+
+        self.default_resume_policy = self.charm_reconciler.add(
+            component=DefaultResumePolicyComponent(
+                charm=self,
+                name="default-resume-policy",
+                template_path=DEFAULT_RESUME_POLICY_FILE,
+                lightkube_client=lightkube.Client(),
+            ),
+            depends_on=[self.leadership_gate, self.kubernetes_resources],
+        )
+
+        self.state_metrics = self.charm_reconciler.add(
+            component=StateMetricsComponent(
+                charm=self,
+                name="state-metrics",
+                template_path=STATE_METRICS_FILE,
+                context_callable=self._state_metrics_context,
+                lightkube_client=lightkube.Client(),
+            ),
+            depends_on=[self.leadership_gate, self.kubernetes_resources],
+        )
+
         self.service_mesh = self.charm_reconciler.add(
             component=ServiceMeshComponent(charm=self, name="service-mesh"),
             depends_on=[self.leadership_gate],
@@ -203,6 +347,8 @@ class KatibControllerOperator(CharmBase):
                     KATIB_DB_MANAGER_SERVICE_PORT=(
                         self.k8s_service_info_requirer.component.get_service_info().port
                     ),
+                    GOMAXPROCS=int(self.model.config["gomaxprocs"]),
+                    GOMEMLIMIT=self.model.config["gomemlimit"],
                 ),
             ),
             depends_on=[
@@ -216,6 +362,81 @@ class KatibControllerOperator(CharmBase):
         self.charm_reconciler.install_default_event_handlers()
         self._logging = LogForwarder(charm=self)
 
+        self.framework.observe(self.on.capture_profile_action, self._on_capture_profile)
+        self.framework.observe(self.on.update_status, self._on_update_status)
+        self.framework.observe(self.on.prune_experiments_action, self._on_prune_experiments)
+        self.framework.observe(self.on.compact_trials_action, self._on_compact_trials)
+        self.framework.observe(self.on.cleanup_suggestions_action, self._on_cleanup_suggestions)
+
+    def _scrape_job_settings(self) -> Dict:
+        """Return the scrape settings of the controller metrics job, from the config."""
+        return scrape_job_settings(
+            scrape_interval=self.config["metrics-scrape-interval"].strip(),
+            scrape_timeout=self.config["metrics-scrape-timeout"].strip(),
+            drop_regex=self.config["metrics-drop-regex"].strip(),
+            keep_regex=self.config["metrics-keep-regex"].strip(),
+        )
+
+    @property
+    def _scrape_jobs(self) -> List[Dict]:
+        """Return the scrape jobs of the controller and, if enabled, of kube-state-metrics."""
+        try:
+            settings = self._scrape_job_settings()
+        except ValueError as err:
+            # Reported as BlockedStatus by the metrics-scrape-config component
+            logger.error(f"Scraping the controller metrics with the Prometheus defaults: {err}")
+            settings = {}
+        jobs = [
+            {
+                "job_name": "katib_controller_metrics",
+                "static_configs": [{"targets": [f"*:{self.config['metrics-port']}"]}],
+                **settings,
+            }
+        ]
+        if self.config["state-metrics"]:
+            jobs.append(
+                {
+                    "job_name": "katib_state_metrics",
+                    "static_configs": [
+                        {
+                            "targets": [
+                                f"{self.app.name}-state-metrics.{self._namespace}.svc:"
+                                f"{STATE_METRICS_PORT}"
+                            ]
+                        }
+                    ],
+                }
+            )
+        return jobs
+
+    def _resource_requirements(self) -> ResourceRequirements:
+        """Return the workload container resources from the cpu-* and memory-* config options."""
+        limits = {
+            resource: self.model.config[f"{resource}-limit"]
+            for resource in ("cpu", "memory")
+            if self.model.config[f"{resource}-limit"]
+        }
+        requests = {
+            resource: self.model.config[f"{resource}-request"]
+            for resource in ("cpu", "memory")
+            if self.model.config[f"{resource}-request"]
+        }
+        return adjust_resource_requirements(limits, requests, adhere_to_requests=True)
+
+    def _state_metrics_context(self) -> Dict[str, str]:
+        """Return the context used to render the kube-state-metrics resources."""
+        images = self.get_images(
+            DEFAULT_IMAGES,
+            parse_images_config(self.model.config["custom_images"]),
+        )
+        return {
+            "app_name": self.app.name,
+            "namespace": self._namespace,
+            "katib_state_metrics": images["katib_state_metrics"],
+            "state_metrics_port": STATE_METRICS_PORT,
+            "state_metrics_trials": self.model.config["state-metrics-trials"],
+        }
+
     def get_images(
         self, default_images: Dict[str, str], custom_images: Dict[str, str]
     ) -> Dict[str, str]:
@@ -246,6 +467,29 @@ class KatibControllerOperator(CharmBase):
                     logger.warning(f"image_name {image_name} not in image list, ignoring.")
         return images
 
+    def _namespace_selector(self) -> Dict:
+        """Return the LabelSelector of the namespaces Katib is enabled in, from the config."""
+        return parse_namespace_selector(
+            self.model.config["namespaces"], self.model.config["namespace-selector"]
+        )
+
+    def _kueue_queue_name(self) -> str:
+        """Return the Kueue queue of the default trial templates, from the config."""
+        kueue_queue_name = self.model.config["kueue-queue-name"].strip()
+        if kueue_queue_name and not KUEUE_QUEUE_NAME_REGEX.match(kueue_queue_name):
+            raise ValueError(f"Invalid kueue-queue-name '{kueue_queue_name}'")
+        return kueue_queue_name
+
+    def _gang_scheduler_name(self) -> str:
+        """Return the scheduler name of the default trial templates, from the config."""
+        gang_scheduler = self.model.config["gang-scheduler"].strip()
+        if gang_scheduler not in GANG_SCHEDULER_NAMES:
+            raise ValueError(
+                f"Invalid gang-scheduler '{gang_scheduler}', expected one of "
+                f"{sorted(name for name in GANG_SCHEDULER_NAMES if name)}"
+            )
+        return GANG_SCHEDULER_NAMES[gang_scheduler]
+
     def _kubernetes_manifests_context(self) -> Dict[str, str]:
         """
         Returns a dict of context used to render the Kubernetes manifests.
@@ -255,7 +499,8 @@ class KatibControllerOperator(CharmBase):
         the keys in the dict returned from `get_images` are the same as the variables
         used in the manifests template.
         2. updates the dict from `1.` to include the other context needed to render
-        the k8s manifests.
+        the k8s manifests, including the namespace selector of the webhooks and the Kueue
+        queue and gang scheduler of the default trial templates.
         3. returns the updated dict containing the full context.
         """
 
@@ -263,12 +508,24 @@ class KatibControllerOperator(CharmBase):
             DEFAULT_IMAGES,
             parse_images_config(self.model.config["custom_images"]),
         )
+        namespace_selector = self._namespace_selector()
+        pod_namespace_selector = {
+            **namespace_selector,
+            "matchLabels": {
+                **namespace_selector.get("matchLabels", {}),
+                **METRICS_COLLECTOR_INJECTION_LABEL,
+            },
+        }
         context_dict.update(
             {
                 "app_name": self.app.name,
                 "namespace": self._namespace,
                 "ca_bundle": b64encode(self._stored.ca.encode("ascii")).decode("utf-8"),
                 "webhookPort": KATIB_WEBHOOK_PORT,
+                "namespace_selector": namespace_selector,
+                "pod_namespace_selector": pod_namespace_selector,
+                "kueue_queue_name": self._kueue_queue_name(),
+                "gang_scheduler_name": self._gang_scheduler_name(),
             }
         )
         return context_dict
@@ -296,6 +553,97 @@ class KatibControllerOperator(CharmBase):
         )
         return context_dict
 
+    def _on_capture_profile(self, event) -> None:
+        """Capture a pprof profile from the workload and return the path it was written to."""
+        port = int(self.model.config["profiling-port"])
+        if not port:
+            event.fail("Profiling is disabled, set the profiling-port config option to enable it.")
+            return
+        try:
+            path = capture_profile(
+                port,
+                profile=event.params["profile"],
+                duration=int(event.params["duration"]),
+                name=self.app.name,
+            )
+        except (OSError, ValueError) as err:
+            event.fail(f"Failed to capture profile: {err}")
+            return
+        event.set_results({"path": str(path), "size": path.stat().st_size})
+
+    def _on_update_status(self, _) -> None:
+        """Apply the Experiment retention policy and the Trial compaction, if enabled."""
+        if not self.unit.is_leader():
+            return
+        try:
+            policy = RetentionPolicy.from_config(self.model.config)
+            if policy.enabled:
+                prune_experiments(lightkube.Client(), policy)
+        except (ApiError, ValueError) as err:
+            logger.error(f"Failed to apply the Experiment retention policy: {err}")
+
+        top_k = int(self.model.config["trial-retention-top-k"])
+        if top_k > 0:
+            try:
+                compact_experiment_trials(
+                    lightkube.Client(),
+                    top_k=top_k,
+                    batch_size=int(self.model.config["trial-gc-batch-size"]),
+                )
+            except ApiError as err:
+                logger.error(f"Failed to compact the Trials of Succeeded Experiments: {err}")
+
+    def _on_prune_experiments(self, event) -> None:
+        """Delete, or list with dry-run, one batch of the expired Experiments."""
+        try:
+            policy = RetentionPolicy.from_config(self.model.config)
+        except ValueError as err:
+            event.fail(str(err))
+            return
+        if not policy.enabled:
+            event.fail(
+                "Retention is disabled, set experiment-retention-days or "
+                "experiment-retention-count to enable it."
+            )
+            return
+        try:
+            pruned = prune_experiments(
+                lightkube.Client(), policy, dry_run=bool(event.params["dry-run"])
+            )
+        except ApiError as err:
+            event.fail(f"Failed to prune Experiments: {err}")
+            return
+        event.set_results({"experiments": ",".join(pruned), "count": len(pruned)})
+
+    def _on_compact_trials(self, event) -> None:
+        """Delete, or list with dry-run, one batch of the Trials outside of the top-K."""
+        top_k = int(self.model.config["trial-retention-top-k"])
+        if top_k <= 0:
+            event.fail("Trial compaction is disabled, set trial-retention-top-k to enable it.")
+            return
+        try:
+            compacted = compact_experiment_trials(
+                lightkube.Client(),
+                top_k=top_k,
+                batch_size=int(self.model.config["trial-gc-batch-size"]),
+                dry_run=bool(event.params["dry-run"]),
+            )
+        except ApiError as err:
+            event.fail(f"Failed to compact Trials: {err}")
+            return
+        event.set_results({"trials": ",".join(compacted), "count": len(compacted)})
+
+    def _on_cleanup_suggestions(self, event) -> None:
+        """Delete, or list with dry-run, the Suggestions left running by finished Experiments."""
+        try:
+            cleaned = cleanup_suggestions(
+                lightkube.Client(), dry_run=bool(event.params["dry-run"])
+            )
+        except ApiError as err:
+            event.fail(f"Failed to clean up Suggestions: {err}")
+            return
+        event.set_results({"suggestions": ",".join(cleaned), "count": len(cleaned)})
+
     def _gen_certs_if_missing(self) -> None:
         """Generate certificates if they don't already exist in _stored."""
         logger.info("Generating certificates if missing.")
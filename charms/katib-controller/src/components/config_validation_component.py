@@ -0,0 +1,36 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+from typing import Callable, List
+
+from charmed_kubeflow_chisme.components import Component
+from ops import ActiveStatus, BlockedStatus, StatusBase
+
+
+class ConfigValidationComponent(Component):
+    """Component to report invalid charm config options.
+
+    The Components that render config options into resources depend on this one, so they are
+    not executed with an invalid config, and the BlockedStatus names the invalid option and value
+    instead of a generic failure to render the resources.
+
+    Args:
+        validators(List[Callable]): functions raising ValueError if the options they read are
+            invalid, with a message naming the option and its value
+    """
+
+    def __init__(
+        self,
+        *args,
+        validators: List[Callable[[], object]],
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self._validators = validators
+
+    def get_status(self) -> StatusBase:
+        for validator in self._validators:
+            try:
+                validator()
+            except ValueError as err:
+                return BlockedStatus(str(err))
+        return ActiveStatus()
@@ -0,0 +1,104 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+import logging
+from pathlib import Path
+
+from charmed_kubeflow_chisme.components import Component
+from charmed_kubeflow_chisme.exceptions import GenericCharmRuntimeError
+from lightkube import ApiError, Client, codecs
+from lightkube.resources.admissionregistration_v1beta1 import (
+    MutatingAdmissionPolicy,
+    MutatingAdmissionPolicyBinding,
+)
+from ops import ActiveStatus, BlockedStatus, StatusBase
+
+logger = logging.getLogger(__name__)
+
+RESUME_POLICIES = ("Never", "LongRunning", "FromVolume")
+MISSING_API_MESSAGE = (
+    "default-resume-policy requires the admissionregistration.k8s.io/v1beta1 "
+    "MutatingAdmissionPolicy API (MutatingAdmissionPolicy feature gate)"
+)
+
+
+class DefaultResumePolicyComponent(Component):
+    """Component to default the resumePolicy of new Experiments from the charm config.
+
+    The default is set by a MutatingAdmissionPolicy, which runs before the Katib defaulting
+    webhook, on Experiments created without a resumePolicy. The policy is deleted when the
+    config option is unset, which also works on clusters that do not serve the
+    MutatingAdmissionPolicy API (Kubernetes < 1.34 without the alpha API enabled) since
+    the deletion then returns 404.
+
+    Args:
+        template_path(Path): path of the template of the policy and its binding
+        lightkube_client(Client): client used to apply and delete the policy
+    """
+
+    def __init__(
+        self,
+        *args,
+        template_path: Path,
+        lightkube_client: Client,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self._template_path = template_path
+        self._lightkube_client = lightkube_client
+
+    @property
+    def _policy_name(self) -> str:
+        return f"{self._charm.app.name}-default-resume-policy"
+
+    def _configure_app_leader(self, event):
+        """Apply the policy if a default resumePolicy is configured, delete it otherwise."""
+        resume_policy = self._charm.model.config["default-resume-policy"]
+        if resume_policy not in RESUME_POLICIES:
+            self._delete_policy()
+            # Reported as BlockedStatus by get_status if the value is invalid
+            return
+
+        resources = codecs.load_all_yaml(
+            Path(self._template_path).read_text(),
+            context={"app_name": self._charm.app.name, "default_resume_policy": resume_policy},
+        )
+        try:
+            for resource in resources:
+                self._lightkube_client.apply(
+                    resource, field_manager=self._charm.app.name, force=True
+                )
+        except ApiError as err:
+            raise GenericCharmRuntimeError(
+                f"Failed to apply the default resumePolicy policy. {MISSING_API_MESSAGE}"
+            ) from err
+
+    def _delete_policy(self):
+        for resource in (MutatingAdmissionPolicyBinding, MutatingAdmissionPolicy):
+            try:
+                self._lightkube_client.delete(resource, self._policy_name)
+            except ApiError as err:
+                if err.status.code != 404:
+                    raise GenericCharmRuntimeError(
+                        "Failed to delete the default resumePolicy MutatingAdmissionPolicy"
+                    ) from err
+
+    def remove(self, event):
+        """Delete the policy on charm removal."""
+        self._delete_policy()
+
+    def get_status(self) -> StatusBase:
+        resume_policy = self._charm.model.config["default-resume-policy"]
+        if resume_policy and resume_policy not in RESUME_POLICIES:
+            return BlockedStatus(
+                f"Invalid default-resume-policy '{resume_policy}', expected one of "
+                f"{list(RESUME_POLICIES)}"
+            )
+        if not resume_policy:
+            return ActiveStatus()
+        for resource in (MutatingAdmissionPolicy, MutatingAdmissionPolicyBinding):
+            try:
+                self._lightkube_client.get(resource, self._policy_name)
+            except ApiError as err:
+                logger.error(f"Failed to get {resource.__name__} {self._policy_name}: {err}")
+                return BlockedStatus(MISSING_API_MESSAGE)
+        return ActiveStatus()
@@ -0,0 +1,121 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+import logging
+from pathlib import Path
+from typing import Callable, Dict
+
+from charmed_kubeflow_chisme.components import Component
+from charmed_kubeflow_chisme.exceptions import GenericCharmRuntimeError
+from lightkube import ApiError, Client, codecs
+from lightkube.resources.admissionregistration_v1 import (
+    ValidatingAdmissionPolicy,
+    ValidatingAdmissionPolicyBinding,
+)
+from ops import ActiveStatus, BlockedStatus, StatusBase
+
+logger = logging.getLogger(__name__)
+
+MISSING_API_MESSAGE = (
+    "Restricting namespaces requires the admissionregistration.k8s.io/v1 "
+    "ValidatingAdmissionPolicy API (Kubernetes 1.30+)"
+)
+
+
+def namespace_selector_to_cel(selector: Dict) -> str:
+    """Return a CEL expression evaluating to true for a namespaceObject matching selector."""
+    conditions = []
+    for key, value in selector.get("matchLabels", {}).items():
+        conditions.append(
+            f"'{key}' in namespaceObject.metadata.labels"
+            f" && namespaceObject.metadata.labels['{key}'] == '{value}'"
+        )
+    for expression in selector.get("matchExpressions", []):
+        values = ", ".join(f"'{value}'" for value in expression["values"])
+        conditions.append(f"namespaceObject.metadata.name in [{values}]")
+    if not conditions:
+        return "true"
+    if selector.get("matchLabels"):
+        conditions.insert(0, "has(namespaceObject.metadata.labels)")
+    return " && ".join(conditions)
+
+
+class NamespaceScopeComponent(Component):
+    """Component to deny the creation of Experiments outside of the configured namespaces.
+
+    The webhooks scoped by the namespace selector only stop Katib from mutating and validating
+    Experiments in other namespaces, so a ValidatingAdmissionPolicy denies their creation. The
+    policy is only applied when the namespaces are restricted, so that clusters which do not
+    serve the ValidatingAdmissionPolicy API can run Katib unscoped, and is deleted otherwise.
+
+    Args:
+        template_path(Path): path of the template of the policy and its binding
+        namespace_selector_getter(Callable): returns the LabelSelector of the namespaces Katib
+            is enabled in, empty if they are not restricted
+        lightkube_client(Client): client used to apply and delete the policy
+    """
+
+    def __init__(
+        self,
+        *args,
+        template_path: Path,
+        namespace_selector_getter: Callable[[], Dict],
+        lightkube_client: Client,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self._template_path = template_path
+        self._namespace_selector_getter = namespace_selector_getter
+        self._lightkube_client = lightkube_client
+
+    @property
+    def _policy_name(self) -> str:
+        return f"{self._charm.app.name}-namespace-scope"
+
+    def _configure_app_leader(self, event):
+        """Apply the policy if the namespaces are restricted, delete it otherwise."""
+        namespace_selector = self._namespace_selector_getter()
+        if not namespace_selector:
+            self._delete_policy()
+            return
+
+        resources = codecs.load_all_yaml(
+            Path(self._template_path).read_text(),
+            context={
+                "app_name": self._charm.app.name,
+                "namespace_scope_expression": namespace_selector_to_cel(namespace_selector),
+            },
+        )
+        try:
+            for resource in resources:
+                self._lightkube_client.apply(
+                    resource, field_manager=self._charm.app.name, force=True
+                )
+        except ApiError as err:
+            raise GenericCharmRuntimeError(
+                f"Failed to apply the namespace scope policy. {MISSING_API_MESSAGE}"
+            ) from err
+
+    def _delete_policy(self):
+        for resource in (ValidatingAdmissionPolicyBinding, ValidatingAdmissionPolicy):
+            try:
+                self._lightkube_client.delete(resource, self._policy_name)
+            except ApiError as err:
+                if err.status.code != 404:
+                    raise GenericCharmRuntimeError(
+                        "Failed to delete the namespace scope policy"
+                    ) from err
+
+    def remove(self, event):
+        """Delete the policy on charm removal."""
+        self._delete_policy()
+
+    def get_status(self) -> StatusBase:
+        if not self._namespace_selector_getter():
+            return ActiveStatus()
+        for resource in (ValidatingAdmissionPolicy, ValidatingAdmissionPolicyBinding):
+            try:
+                self._lightkube_client.get(resource, self._policy_name)
+            except ApiError as err:
+                logger.error(f"Failed to get {resource.__name__} {self._policy_name}: {err}")
+                return BlockedStatus(MISSING_API_MESSAGE)
+        return ActiveStatus()
@@ -6,6 +6,8 @@ import logging
 from charmed_kubeflow_chisme.components.pebble_component import PebbleServiceComponent
 from ops.pebble import Layer
 
+from go_runtime import go_runtime_environment
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,6 +17,8 @@ class KatibControllerInputs:
 
     NAMESPACE: str
     KATIB_DB_MANAGER_SERVICE_PORT: str
+    GOMAXPROCS: int = 0
+    GOMEMLIMIT: str = ""
 
 
 class KatibControllerPebbleService(PebbleServiceComponent):
@@ -30,6 +34,18 @@ class KatibControllerPebbleService(PebbleServiceComponent):
         except Exception as err:
             raise ValueError("Failed to get inputs for Pebble container.") from err
 
+        environment = {
+            "KATIB_CORE_NAMESPACE": str(inputs.NAMESPACE).lower(),
+            "KATIB_DB_MANAGER_SERVICE_PORT": str(inputs.KATIB_DB_MANAGER_SERVICE_PORT),
+        }
+        environment.update(
+            go_runtime_environment(
+                self._charm.unit.get_container(self.container_name),
+                gomaxprocs=inputs.GOMAXPROCS,
+                gomemlimit=inputs.GOMEMLIMIT,
+            )
+        )
+
         return Layer(
             {
                 "summary": "katib-controller layer",
@@ -40,12 +56,7 @@ class KatibControllerPebbleService(PebbleServiceComponent):
                         "summary": "Entry point for katib-controller image",
                         "command": "./katib-controller --katib-config=/katib-config/katib-config.yaml",  # noqa E501
                         "startup": "enabled",
-                        "environment": {
-                            "KATIB_CORE_NAMESPACE": str(inputs.NAMESPACE).lower(),
-                            "KATIB_DB_MANAGER_SERVICE_PORT": str(
-                                inputs.KATIB_DB_MANAGER_SERVICE_PORT
-                            ),
-                        },
+                        "environment": environment,
                     }
                 },
             }
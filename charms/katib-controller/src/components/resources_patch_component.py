@@ -0,0 +1,31 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+from charmed_kubeflow_chisme.components import Component
+from charms.observability_libs.v0.kubernetes_compute_resources_patch import (
+    KubernetesComputeResourcesPatch,
+)
+from ops import StatusBase
+
+
+class ResourcesPatchComponent(Component):
+    """Component to report the status of the compute resources patch of the workload container.
+
+    The StatefulSet is patched by the KubernetesComputeResourcesPatch charm library on its own
+    refresh events, this Component reports the status of the patch through the CharmReconciler,
+    e.g. while the unit's pod has not been restarted with the new resources.
+
+    Args:
+        resources_patch(KubernetesComputeResourcesPatch): patch of the workload container
+    """
+
+    def __init__(
+        self,
+        *args,
+        resources_patch: KubernetesComputeResourcesPatch,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self._resources_patch = resources_patch
+
+    def get_status(self) -> StatusBase:
+        return self._resources_patch.get_status()
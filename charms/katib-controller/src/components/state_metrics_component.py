@@ -0,0 +1,94 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+import logging
+from pathlib import Path
+from typing import Callable, Dict
+
+from charmed_kubeflow_chisme.components import Component
+from charmed_kubeflow_chisme.exceptions import GenericCharmRuntimeError
+from lightkube import ApiError, Client, codecs
+from lightkube.resources.apps_v1 import Deployment
+from ops import ActiveStatus, BlockedStatus, StatusBase, WaitingStatus
+
+logger = logging.getLogger(__name__)
+
+
+class StateMetricsComponent(Component):
+    """Component to run kube-state-metrics exporting the state of the Katib custom resources.
+
+    kube-state-metrics watches Experiments, Trials and Suggestions through shared informers and
+    exports them as configured in its custom resource state config. It runs as a Deployment
+    when the state-metrics config option is set, and is deleted otherwise.
+
+    Args:
+        template_path(Path): path of the template of the kube-state-metrics resources
+        context_callable(Callable): returns the context used to render the template
+        lightkube_client(Client): client used to apply and delete the resources
+    """
+
+    def __init__(
+        self,
+        *args,
+        template_path: Path,
+        context_callable: Callable[[], Dict],
+        lightkube_client: Client,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self._template_path = template_path
+        self._context_callable = context_callable
+        self._lightkube_client = lightkube_client
+
+    def _render_resources(self):
+        return codecs.load_all_yaml(
+            Path(self._template_path).read_text(), context=self._context_callable()
+        )
+
+    def _configure_app_leader(self, event):
+        """Apply the kube-state-metrics resources if enabled, delete them otherwise."""
+        if not self._charm.model.config["state-metrics"]:
+            self._delete_resources()
+            return
+
+        try:
+            for resource in self._render_resources():
+                self._lightkube_client.apply(
+                    resource, field_manager=self._charm.app.name, force=True
+                )
+        except ApiError as err:
+            raise GenericCharmRuntimeError(
+                "Failed to apply the kube-state-metrics resources"
+            ) from err
+
+    def _delete_resources(self):
+        # Delete in reverse order, so that the Deployment goes before its ServiceAccount
+        for resource in reversed(self._render_resources()):
+            try:
+                self._lightkube_client.delete(
+                    type(resource), resource.metadata.name, namespace=resource.metadata.namespace
+                )
+            except ApiError as err:
+                if err.status.code != 404:
+                    raise GenericCharmRuntimeError(
+                        "Failed to delete the kube-state-metrics resources"
+                    ) from err
+
+    def remove(self, event):
+        """Delete the kube-state-metrics resources on charm removal."""
+        self._delete_resources()
+
+    def get_status(self) -> StatusBase:
+        if not self._charm.model.config["state-metrics"]:
+            return ActiveStatus()
+
+        for resource in self._render_resources():
+            try:
+                found = self._lightkube_client.get(
+                    type(resource), resource.metadata.name, namespace=resource.metadata.namespace
+                )
+            except ApiError as err:
+                logger.error(f"Failed to get {resource.kind} {resource.metadata.name}: {err}")
+                return BlockedStatus("kube-state-metrics resources are missing, see logs")
+            if isinstance(found, Deployment) and not (found.status and found.status.readyReplicas):
+                return WaitingStatus("Waiting for kube-state-metrics to be ready")
+        return ActiveStatus()
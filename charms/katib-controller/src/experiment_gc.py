@@ -0,0 +1,370 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Retention policy for finished Katib Experiments, their Trials and their Suggestions."""
+
+import json
+import logging
+import statistics
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from lightkube import ApiError, Client
+from lightkube.generic_resource import create_namespaced_resource
+from lightkube.types import PatchType
+
+logger = logging.getLogger(__name__)
+
+Experiment = create_namespaced_resource("kubeflow.org", "v1beta1", "Experiment", "experiments")
+Trial = create_namespaced_resource("kubeflow.org", "v1beta1", "Trial", "trials")
+Suggestion = create_namespaced_resource("kubeflow.org", "v1beta1", "Suggestion", "suggestions")
+
+# Conditions of an Experiment that has finished running
+FINISHED_CONDITIONS = ("Succeeded", "Failed")
+# Final conditions of a Trial, counted in the summary of a compacted Experiment
+TRIAL_FINAL_CONDITIONS = ("Succeeded", "Failed", "EarlyStopped", "MetricsUnavailable", "Killed")
+# Label set by the Katib controller on the Trials of an Experiment
+TRIAL_EXPERIMENT_LABEL = "katib.kubeflow.org/experiment"
+# Trials annotated with this set to "true" are never deleted by the compaction
+TRIAL_KEEP_ANNOTATION = "katib.kubeflow.org/keep"
+# Annotation of a compacted Experiment holding the statistics of all of its Trials
+TRIAL_SUMMARY_ANNOTATION = "katib.kubeflow.org/trial-summary"
+# Annotation of an Experiment whose Trials outside of the top-K were all deleted, holding the
+# top-K and the number of Trials of the Experiment at the time
+TRIALS_COMPACTED_ANNOTATION = "katib.kubeflow.org/trials-compacted"
+# resumePolicy of an Experiment, Katib defaults it to Never
+DEFAULT_RESUME_POLICY = "Never"
+
+
+@dataclass
+class RetentionPolicy:
+    """Which finished Experiments are kept, from the experiment-retention-* config options.
+
+    Args:
+        max_age(timedelta): finished Experiments older than this are expired, None to disable
+        max_count(int): number of finished Experiments kept per namespace, 0 to disable
+        statuses(Tuple[str]): conditions of the Experiments the policy applies to
+        batch_size(int): maximum number of Experiments deleted in one run
+    """
+
+    max_age: Optional[timedelta]
+    max_count: int
+    statuses: Tuple[str, ...]
+    batch_size: int
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_age or self.max_count)
+
+    @classmethod
+    def from_config(cls, config: Mapping) -> "RetentionPolicy":
+        """Build the policy from the charm config.
+
+        Raises:
+            ValueError: if an option is negative or a status is not a finished condition.
+        """
+        days = int(config["experiment-retention-days"])
+        max_count = int(config["experiment-retention-count"])
+        batch_size = int(config["experiment-gc-batch-size"])
+        statuses = tuple(
+            status.strip()
+            for status in config["experiment-retention-statuses"].split(",")
+            if status.strip()
+        )
+        if days < 0 or max_count < 0 or batch_size < 1:
+            raise ValueError(
+                "experiment-retention-days and experiment-retention-count must not be negative,"
+                " and experiment-gc-batch-size must be positive"
+            )
+        for status in statuses:
+            if status not in FINISHED_CONDITIONS:
+                raise ValueError(
+                    f"Invalid experiment-retention-statuses entry '{status}', expected one of "
+                    f"{list(FINISHED_CONDITIONS)}"
+                )
+        return cls(
+            max_age=timedelta(days=days) if days else None,
+            max_count=max_count,
+            statuses=statuses,
+            batch_size=batch_size,
+        )
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+
+
+def get_finished_status(experiment) -> Tuple[Optional[str], Optional[datetime]]:
+    """Return the finished condition of an Experiment and when it finished.
+
+    Returns (None, None) for an Experiment that is still running.
+    """
+    status = experiment.status or {}
+    for condition in status.get("conditions") or []:
+        if condition.get("type") in FINISHED_CONDITIONS and condition.get("status") == "True":
+            finished_at = _parse_time(status.get("completionTime")) or _parse_time(
+                condition.get("lastTransitionTime")
+            )
+            return condition["type"], finished_at
+    return None, None
+
+
+def get_resume_policy(experiment) -> str:
+    """Return the resumePolicy of an Experiment, Never if it is not set."""
+    return (experiment.spec or {}).get("resumePolicy") or DEFAULT_RESUME_POLICY
+
+
+def select_expired_experiments(
+    experiments: Iterable, policy: RetentionPolicy, now: datetime
+) -> List:
+    """Return the finished Experiments expired by the policy, oldest first.
+
+    An Experiment is expired if it finished more than max_age ago, or if more than max_count
+    more recently finished Experiments of its namespace are kept.
+    """
+    finished_by_namespace = defaultdict(list)
+    for experiment in experiments:
+        status, finished_at = get_finished_status(experiment)
+        if status in policy.statuses and finished_at is not None:
+            finished_by_namespace[experiment.metadata.namespace].append((finished_at, experiment))
+
+    expired = []
+    for finished in finished_by_namespace.values():
+        finished.sort(key=lambda item: item[0], reverse=True)
+        for index, (finished_at, experiment) in enumerate(finished):
+            too_old = policy.max_age is not None and now - finished_at > policy.max_age
+            too_many = policy.max_count and index >= policy.max_count
+            if too_old or too_many:
+                expired.append((finished_at, experiment))
+
+    return [experiment for _, experiment in sorted(expired, key=lambda item: item[0])]
+
+
+def prune_experiments(
+    client: Client, policy: RetentionPolicy, dry_run: bool = False, now: Optional[datetime] = None
+) -> List[str]:
+    """Delete one batch of the Experiments expired by the policy.
+
+    Trials, Suggestions and trial Jobs are owned by their Experiment, so the Kubernetes garbage
+    collector removes them once the Experiment is deleted. Deleting at most batch_size
+    Experiments per run bounds the load on the API server when a large backlog expires at once.
+
+    Returns:
+        The "namespace/name" of the Experiments deleted, or that would be deleted on a dry run.
+    """
+    now = now or datetime.now(timezone.utc)
+    expired = select_expired_experiments(client.list(Experiment, namespace="*"), policy, now)
+    if len(expired) > policy.batch_size:
+        logger.info(
+            f"{len(expired)} Experiments expired, deleting {policy.batch_size} in this run"
+        )
+
+    pruned = []
+    for experiment in expired[: policy.batch_size]:
+        name, namespace = experiment.metadata.name, experiment.metadata.namespace
+        if not dry_run:
+            try:
+                client.delete(Experiment, name, namespace=namespace)
+            except ApiError as err:
+                if err.status.code != 404:
+                    raise
+            logger.info(f"Deleted expired Experiment {namespace}/{name}")
+        pruned.append(f"{namespace}/{name}")
+    return pruned
+
+
+def get_objective_value(trial, objective: Mapping) -> Optional[float]:
+    """Return the objective metric value of a Trial, or None if it did not report one.
+
+    The value follows the metric strategy of the objective metric, which defaults to the best
+    value seen for the objective type like in the Katib controller.
+    """
+    metric_name = objective.get("objectiveMetricName")
+    strategy = "max" if objective.get("type") == "maximize" else "min"
+    for metric_strategy in objective.get("metricStrategies") or []:
+        if metric_strategy.get("name") == metric_name:
+            strategy = metric_strategy.get("value", strategy)
+
+    observation = (trial.status or {}).get("observation") or {}
+    for metric in observation.get("metrics") or []:
+        if metric.get("name") == metric_name:
+            try:
+                return float(metric.get(strategy))
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def _get_final_condition(trial) -> Optional[str]:
+    for condition in (trial.status or {}).get("conditions") or []:
+        if condition.get("type") in TRIAL_FINAL_CONDITIONS and condition.get("status") == "True":
+            return condition["type"]
+    return None
+
+
+def select_trials_to_delete(trials: Iterable, objective: Mapping, top_k: int) -> List:
+    """Return the Trials outside of the top_k by objective value that are not annotated to keep.
+
+    Trials without an objective value rank after all the others.
+    """
+    maximize = objective.get("type") == "maximize"
+
+    def rank(trial) -> Tuple[bool, float]:
+        value = get_objective_value(trial, objective)
+        if value is None:
+            return True, 0.0
+        return False, -value if maximize else value
+
+    ranked = sorted(trials, key=rank)
+    return [
+        trial
+        for trial in ranked[top_k:]
+        if (trial.metadata.annotations or {}).get(TRIAL_KEEP_ANNOTATION) != "true"
+    ]
+
+
+def summarize_trials(trials: List, objective: Mapping) -> Dict:
+    """Return the statistics of the Trials of an Experiment kept after the compaction."""
+    summary = {"trials": len(trials)}
+    for condition in TRIAL_FINAL_CONDITIONS:
+        count = sum(1 for trial in trials if _get_final_condition(trial) == condition)
+        if count:
+            summary[condition[0].lower() + condition[1:]] = count
+
+    values = [get_objective_value(trial, objective) for trial in trials]
+    values = [value for value in values if value is not None]
+    if values:
+        summary["objective"] = {
+            "metricName": objective.get("objectiveMetricName"),
+            "min": min(values),
+            "max": max(values),
+            "mean": statistics.fmean(values),
+        }
+    return summary
+
+
+def compact_experiment_trials(
+    client: Client, top_k: int, batch_size: int, dry_run: bool = False
+) -> List[str]:
+    """Delete the Trials of Succeeded Experiments that are not among the top_k by objective.
+
+    Only Experiments with the Never resumePolicy are compacted: Katib restarts LongRunning and
+    FromVolume Experiments whose maxTrialCount is changed, and would run the deleted Trials again.
+
+    The statistics of all the Trials of an Experiment are written to its trial-summary
+    annotation before the first of its Trials is deleted, and are not updated afterwards so that
+    they keep describing the whole sweep. Jobs and pods are owned by their Trial and removed by
+    the Kubernetes garbage collector. At most batch_size Trials are deleted per run.
+
+    Once all of its Trials outside of the top_k are deleted, an Experiment is annotated with
+    the top_k and its number of Trials, and its Trials are not listed again unless either
+    changes.
+
+    Returns:
+        The "namespace/name" of the Trials deleted, or that would be deleted on a dry run.
+    """
+    compacted = []
+    for experiment in client.list(Experiment, namespace="*"):
+        if len(compacted) >= batch_size:
+            break
+        status, _ = get_finished_status(experiment)
+        if status != "Succeeded" or get_resume_policy(experiment) != "Never":
+            continue
+
+        name, namespace = experiment.metadata.name, experiment.metadata.namespace
+        annotations = experiment.metadata.annotations or {}
+        marker = json.dumps({"topK": top_k, "trials": (experiment.status or {}).get("trials")})
+        if annotations.get(TRIALS_COMPACTED_ANNOTATION) == marker:
+            continue
+
+        objective = (experiment.spec or {}).get("objective") or {}
+        trials = list(
+            client.list(Trial, namespace=namespace, labels={TRIAL_EXPERIMENT_LABEL: name})
+        )
+        to_delete = select_trials_to_delete(trials, objective, top_k)
+        complete = len(to_delete) <= batch_size - len(compacted)
+        to_delete = to_delete[: batch_size - len(compacted)]
+        if dry_run:
+            compacted.extend(f"{namespace}/{trial.metadata.name}" for trial in to_delete)
+            continue
+
+        if to_delete:
+            if TRIAL_SUMMARY_ANNOTATION not in annotations:
+                summary = json.dumps(summarize_trials(trials, objective))
+                client.patch(
+                    Experiment,
+                    name,
+                    {"metadata": {"annotations": {TRIAL_SUMMARY_ANNOTATION: summary}}},
+                    namespace=namespace,
+                    patch_type=PatchType.MERGE,
+                )
+            for trial in to_delete:
+                try:
+                    client.delete(Trial, trial.metadata.name, namespace=namespace)
+                except ApiError as err:
+                    if err.status.code != 404:
+                        raise
+            logger.info(f"Deleted {len(to_delete)} Trials of Experiment {namespace}/{name}")
+        if complete:
+            client.patch(
+                Experiment,
+                name,
+                {"metadata": {"annotations": {TRIALS_COMPACTED_ANNOTATION: marker}}},
+                namespace=namespace,
+                patch_type=PatchType.MERGE,
+            )
+        compacted.extend(f"{namespace}/{trial.metadata.name}" for trial in to_delete)
+    return compacted
+
+
+def find_leftover_suggestions(client: Client) -> List:
+    """Return the Suggestions of finished Experiments whose Deployment is still running.
+
+    This is only the case for Experiments with the LongRunning resumePolicy, which keep the
+    Suggestion Deployment and Service to resume without losing the state of the algorithm.
+    Katib does not reset the DeploymentReady condition of the Suggestions of other Experiments
+    once their Deployment is deleted, so they are not selected.
+    """
+    finished = {
+        (experiment.metadata.namespace, experiment.metadata.name)
+        for experiment in client.list(Experiment, namespace="*")
+        if get_finished_status(experiment)[0] is not None
+        and get_resume_policy(experiment) == "LongRunning"
+    }
+    leftover = []
+    for suggestion in client.list(Suggestion, namespace="*"):
+        if (suggestion.metadata.namespace, suggestion.metadata.name) not in finished:
+            continue
+        conditions = (suggestion.status or {}).get("conditions") or []
+        if any(
+            c.get("type") == "DeploymentReady" and c.get("status") == "True" for c in conditions
+        ):
+            leftover.append(suggestion)
+    return leftover
+
+
+def cleanup_suggestions(client: Client, dry_run: bool = False) -> List[str]:
+    """Delete the Suggestions of finished LongRunning Experiments that still run a Deployment.
+
+    The Deployment and Service are owned by the Suggestion and removed by the Kubernetes garbage
+    collector. Resuming one of these Experiments afterwards starts a new Suggestion, without the
+    state of the previous one.
+
+    Returns:
+        The "namespace/name" of the Suggestions deleted, or that would be deleted on a dry run.
+    """
+    cleaned = []
+    for suggestion in find_leftover_suggestions(client):
+        name, namespace = suggestion.metadata.name, suggestion.metadata.namespace
+        if not dry_run:
+            try:
+                client.delete(Suggestion, name, namespace=namespace)
+            except ApiError as err:
+                if err.status.code != 404:
+                    raise
+            logger.info(f"Deleted Suggestion {namespace}/{name} of a finished Experiment")
+        cleaned.append(f"{namespace}/{name}")
+    return cleaned
@@ -0,0 +1,146 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Scrape settings of the katib-controller metrics job."""
+
+import re
+from typing import Dict, Optional
+
+# Prometheus duration format, e.g. "30s", "1m" or "1h30m"
+PROMETHEUS_DURATION_PATTERN = re.compile(
+    r"^(([0-9]+)y)?(([0-9]+)w)?(([0-9]+)d)?(([0-9]+)h)?(([0-9]+)m)?(([0-9]+)s)?(([0-9]+)ms)?$"
+)
+PROMETHEUS_DURATION_UNITS = {
+    "y": 365 * 24 * 3600,
+    "w": 7 * 24 * 3600,
+    "d": 24 * 3600,
+    "h": 3600,
+    "m": 60,
+    "s": 1,
+    "ms": 1e-3,
+}
+# Metrics of the Katib controllers, always kept so that a keep regex cannot drop them
+KATIB_METRICS_REGEX = "katib_.+"
+# Group prefixes of Python regexes that RE2, the regex engine of Prometheus, does not support
+RE2_UNSUPPORTED_GROUPS = {
+    "(?=": "lookahead",
+    "(?!": "negative lookahead",
+    "(?<=": "lookbehind",
+    "(?<!": "negative lookbehind",
+    "(?P=": "backreference",
+    "(?>": "atomic group",
+}
+
+
+def parse_duration(value: str) -> float:
+    """Return the number of seconds of a Prometheus duration.
+
+    Raises:
+        ValueError: if the value is not a Prometheus duration.
+    """
+    if not value or not PROMETHEUS_DURATION_PATTERN.match(value):
+        raise ValueError(f"'{value}' is not a Prometheus duration such as '30s'")
+    return sum(
+        int(amount) * PROMETHEUS_DURATION_UNITS[unit]
+        for amount, unit in re.findall(r"([0-9]+)(ms|y|w|d|h|m|s)", value)
+    )
+
+
+def _find_re2_unsupported(value: str) -> Optional[str]:
+    """Return the first construct of the regex that RE2 does not support, None if there is none.
+
+    Escaped characters and character classes are skipped, since the constructs have no special
+    meaning there.
+    """
+    index = 0
+    in_class = False
+    while index < len(value):
+        char = value[index]
+        following = value[index + 1] if index + 1 < len(value) else ""
+        if char == "\\":
+            if not in_class and following.isdigit() and following != "0":
+                return "backreference"
+            index += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+            # A leading "]" (after an optional "^") is a literal member of the class
+            if following == "^":
+                index += 1
+            if value.startswith("]", index + 1):
+                index += 1
+        elif char == "(":
+            for prefix, construct in RE2_UNSUPPORTED_GROUPS.items():
+                if value.startswith(prefix, index):
+                    return construct
+        elif char in "*+?}" and following == "+":
+            return "possessive quantifier"
+        index += 1
+    return None
+
+
+def _check_regex(option: str, value: str) -> None:
+    try:
+        re.compile(value)
+    except re.error as err:
+        raise ValueError(f"Invalid {option} '{value}': {err}") from err
+    construct = _find_re2_unsupported(value)
+    if construct:
+        raise ValueError(f"Invalid {option} '{value}': Prometheus does not support {construct}")
+
+
+def scrape_job_settings(
+    scrape_interval: str = "", scrape_timeout: str = "", drop_regex: str = "", keep_regex: str = ""
+) -> Dict:
+    """Return the scrape interval, timeout and metric relabel configs of a scrape job.
+
+    Settings left empty are not set, so the defaults of Prometheus apply. Series whose name
+    matches the drop regex are dropped, then only the series whose name matches the keep regex,
+    or is a Katib metric, are kept. Relabelling happens after the scrape, so it saves the
+    storage and ingestion of the dropped series but not their transfer.
+
+    Args:
+        scrape_interval: interval between scrapes, as a Prometheus duration.
+        scrape_timeout: timeout of a scrape, as a Prometheus duration.
+        drop_regex: regex of the names of the series to drop.
+        keep_regex: regex of the names of the series to keep.
+
+    Raises:
+        ValueError: if a duration or a regex is invalid, or uses a construct that the RE2 engine
+            of Prometheus does not support, or if the timeout exceeds the interval.
+    """
+    settings = {}
+    if scrape_interval:
+        settings["scrape_interval"] = scrape_interval
+    if scrape_timeout:
+        settings["scrape_timeout"] = scrape_timeout
+    try:
+        interval = parse_duration(scrape_interval) if scrape_interval else None
+        timeout = parse_duration(scrape_timeout) if scrape_timeout else None
+    except ValueError as err:
+        raise ValueError(f"Invalid metrics scrape interval or timeout: {err}") from err
+    if interval is not None and timeout is not None and timeout > interval:
+        raise ValueError(
+            f"metrics-scrape-timeout ({scrape_timeout}) exceeds "
+            f"metrics-scrape-interval ({scrape_interval})"
+        )
+
+    metric_relabel_configs = []
+    if drop_regex:
+        _check_regex("metrics-drop-regex", drop_regex)
+        metric_relabel_configs.append(
+            {"source_labels": ["__name__"], "regex": drop_regex, "action": "drop"}
+        )
+    if keep_regex:
+        _check_regex("metrics-keep-regex", keep_regex)
+        metric_relabel_configs.append(
+            {
+                "source_labels": ["__name__"],
+                "regex": f"{KATIB_METRICS_REGEX}|{keep_regex}",
+                "action": "keep",
+            }
+        )
+    if metric_relabel_configs:
+        settings["metric_relabel_configs"] = metric_relabel_configs
+    return settings
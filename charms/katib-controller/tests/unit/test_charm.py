@@ -2,15 +2,33 @@
 # See LICENSE file for licensing details.
 
 import json
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
+import yaml
 from charmed_kubeflow_chisme.exceptions import GenericCharmRuntimeError
-from ops.model import ActiveStatus, BlockedStatus, TooManyRelatedAppsError
-from ops.testing import Harness
+from lightkube import ApiError
+from lightkube.models.apps_v1 import DeploymentSpec, DeploymentStatus
+from lightkube.models.core_v1 import PodTemplateSpec
+from lightkube.models.meta_v1 import LabelSelector, ObjectMeta
+from lightkube.resources.apps_v1 import Deployment
+from ops.model import ActiveStatus, BlockedStatus, TooManyRelatedAppsError, WaitingStatus
+from ops.testing import ActionFailed, Harness
 
-from charm import KatibControllerOperator
+from charm import KatibControllerOperator, parse_namespace_selector
+from components.namespace_scope_component import namespace_selector_to_cel
+from experiment_gc import (
+    TRIAL_SUMMARY_ANNOTATION,
+    TRIALS_COMPACTED_ANNOTATION,
+    Experiment,
+    RetentionPolicy,
+    Suggestion,
+    Trial,
+    select_expired_experiments,
+    select_trials_to_delete,
+)
 
 IMAGES_CONTEXT = json.loads(Path("src/default-custom-images.json").read_text())
 
@@ -33,6 +51,12 @@ EXPECTED_PEBBLE_LAYER = {
 }
 
 
+def _api_error(code: int) -> ApiError:
+    response = MagicMock()
+    response.json.return_value = {"code": code, "message": "error"}
+    return ApiError(response=response)
+
+
 @pytest.fixture
 def harness() -> Harness:
     harness = Harness(KatibControllerOperator)
@@ -63,6 +87,14 @@ def mocked_kubernetes_service_patch(mocker):
     yield mocked_kubernetes_service_patch
 
 
+@pytest.fixture(autouse=True)
+def mocked_compute_resources_patch(mocker):
+    """Mocks the KubernetesComputeResourcesPatch for the charm, which patches the StatefulSet."""
+    mocked_compute_resources_patch = mocker.patch("charm.KubernetesComputeResourcesPatch")
+    mocked_compute_resources_patch.return_value.get_status.return_value = ActiveStatus()
+    yield mocked_compute_resources_patch
+
+
 @pytest.fixture()
 def mocked_service_mesh_component(mocker):
     """Mocks the ServiceMeshComponent for the charm."""
@@ -312,3 +344,973 @@ def test_service_mesh_get_status_error_handling(
                 harness.charm.service_mesh.component.get_status()
 
             assert "Error validating raw policies" in str(exc_info.value)
+
+
+@pytest.mark.parametrize(
+    "cgroup_files,config,expected_environment",
+    [
+        # cgroup v2 limits are translated into Go runtime settings
+        (
+            {"/sys/fs/cgroup/cpu.max": "250000 100000", "/sys/fs/cgroup/memory.max": "1000"},
+            {},
+            {"GOMAXPROCS": "2", "GOMEMLIMIT": "900"},
+        ),
+        # cgroup v1 limits are used when the v2 files are absent
+        (
+            {
+                "/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "50000",
+                "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000",
+                "/sys/fs/cgroup/memory/memory.limit_in_bytes": "9223372036854771712",
+            },
+            {},
+            {"GOMAXPROCS": "1"},
+        ),
+        # no limits leave the Go defaults in place
+        ({"/sys/fs/cgroup/cpu.max": "max 100000", "/sys/fs/cgroup/memory.max": "max"}, {}, {}),
+        # config overrides the derived values
+        (
+            {"/sys/fs/cgroup/cpu.max": "400000 100000", "/sys/fs/cgroup/memory.max": "1000"},
+            {"gomaxprocs": 8, "gomemlimit": "off"},
+            {"GOMAXPROCS": "8", "GOMEMLIMIT": "off"},
+        ),
+    ],
+)
+def test_pebble_layer_go_runtime_environment(
+    cgroup_files,
+    config,
+    expected_environment,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that GOMAXPROCS and GOMEMLIMIT are derived from cgroup limits or config."""
+    # Arrange
+    harness.set_leader(True)
+    harness.set_model_name(TEST_NAMESPACE)
+    harness.update_config(config)
+    setup_k8s_service_info_relation(harness, "remote-test-app")
+    harness.set_can_connect("katib-controller", True)
+    harness.begin()
+    container = harness.charm.unit.get_container("katib-controller")
+    for path, content in cgroup_files.items():
+        container.push(path, content, make_dirs=True)
+
+    # Act
+    layer = harness.charm.katib_controller_container.component.get_layer()
+
+    # Assert
+    environment = layer.services["katib-controller"].environment
+    for variable in ["GOMAXPROCS", "GOMEMLIMIT"]:
+        assert environment.get(variable) == expected_environment.get(variable)
+
+
+def test_resources_patch_component(
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+    mocked_compute_resources_patch,
+):
+    """Test that the resources patch gets the configured resources and reports its status."""
+    # Arrange
+    harness.update_config({"cpu-limit": "2", "memory-request": "256Mi"})
+    waiting = WaitingStatus("Waiting for resource limit patch to apply")
+    mocked_compute_resources_patch.return_value.get_status.return_value = waiting
+    harness.begin()
+
+    # Act
+    resource_requirements = mocked_compute_resources_patch.call_args.kwargs["resource_reqs_func"]()
+
+    # Assert
+    assert mocked_compute_resources_patch.call_args.args[1] == "katib-controller"
+    assert resource_requirements.limits["cpu"] == "2"
+    assert resource_requirements.requests["memory"] == "256Mi"
+    assert harness.charm.resources_patch.component.get_status() == waiting
+
+
+@pytest.mark.parametrize(
+    "profile,duration,expected_url",
+    [
+        ("cpu", 10, "http://localhost:6060/debug/pprof/profile?seconds=10"),
+        ("heap", 5, "http://localhost:6060/debug/pprof/heap?seconds=5"),
+        ("goroutine", 5, "http://localhost:6060/debug/pprof/goroutine"),
+    ],
+)
+def test_capture_profile_action(
+    profile,
+    duration,
+    expected_url,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+    mocker,
+    tmp_path,
+):
+    """Test that the action fetches the profile from localhost and returns its path."""
+    # Arrange
+    mocker.patch("profiling.PROFILES_DIR", tmp_path)
+    mocked_urlopen = mocker.patch("profiling.urlopen")
+    mocked_urlopen.return_value.__enter__.return_value.read.return_value = b"profile-data"
+    harness.update_config({"profiling-port": 6060})
+    harness.begin()
+
+    # Act
+    output = harness.run_action("capture-profile", {"profile": profile, "duration": duration})
+
+    # Assert
+    assert mocked_urlopen.call_args.args[0] == expected_url
+    assert Path(output.results["path"]).parent == tmp_path
+    assert Path(output.results["path"]).read_bytes() == b"profile-data"
+    assert output.results["size"] == len(b"profile-data")
+
+
+def test_capture_profile_action_disabled(
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the action fails when the profiling endpoint is not configured."""
+    harness.begin()
+
+    with pytest.raises(ActionFailed) as err:
+        harness.run_action("capture-profile")
+
+    assert "profiling-port" in err.value.message
+
+
+@pytest.mark.parametrize(
+    "namespaces,label_selector,expected_selector,expected_expression",
+    [
+        ("", "", {}, "true"),
+        (
+            "team-a, team-b",
+            "",
+            {
+                "matchExpressions": [
+                    {
+                        "key": "kubernetes.io/metadata.name",
+                        "operator": "In",
+                        "values": ["team-a", "team-b"],
+                    }
+                ]
+            },
+            "namespaceObject.metadata.name in ['team-a', 'team-b']",
+        ),
+        (
+            "",
+            "katib.kubeflow.org/enabled=true",
+            {"matchLabels": {"katib.kubeflow.org/enabled": "true"}},
+            "has(namespaceObject.metadata.labels)"
+            " && 'katib.kubeflow.org/enabled' in namespaceObject.metadata.labels"
+            " && namespaceObject.metadata.labels['katib.kubeflow.org/enabled'] == 'true'",
+        ),
+    ],
+)
+def test_parse_namespace_selector(
+    namespaces, label_selector, expected_selector, expected_expression
+):
+    """Test the namespace selector and its CEL equivalent built from the config."""
+    selector = parse_namespace_selector(namespaces, label_selector)
+
+    assert selector == expected_selector
+    assert namespace_selector_to_cel(selector) == expected_expression
+
+
+@pytest.mark.parametrize(
+    "namespaces,label_selector",
+    [("Team_A", ""), ("", "shard"), ("", "shard=a'b")],
+)
+def test_parse_namespace_selector_invalid(namespaces, label_selector):
+    """Test that malformed namespaces or label requirements are rejected."""
+    with pytest.raises(ValueError):
+        parse_namespace_selector(namespaces, label_selector)
+
+
+def test_namespace_scoped_manifests(
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the webhooks and the admission policy are scoped to the configured namespaces."""
+    # Arrange
+    harness.update_config({"namespaces": "team-a", "namespace-selector": "shard=one"})
+    harness.begin()
+    krh = harness.charm.kubernetes_resources.component._get_kubernetes_resource_handler()
+
+    # Act
+    manifests = {(type(r).__name__, r.metadata.name): r for r in krh.render_manifests()}
+
+    # Assert
+    expected_selector = {
+        "matchLabels": {"shard": "one"},
+        "matchExpressions": [
+            {"key": "kubernetes.io/metadata.name", "operator": "In", "values": ["team-a"]}
+        ],
+    }
+    validating = manifests[("ValidatingWebhookConfiguration", "katib.kubeflow.org")]
+    assert validating.webhooks[0].namespaceSelector.to_dict() == expected_selector
+    mutating = manifests[("MutatingWebhookConfiguration", "katib.kubeflow.org")]
+    experiment_webhook, pod_webhook = mutating.webhooks
+    assert experiment_webhook.namespaceSelector.to_dict() == expected_selector
+    assert pod_webhook.namespaceSelector.matchLabels == {
+        "shard": "one",
+        "katib.kubeflow.org/metrics-collector-injection": "enabled",
+    }
+
+
+@pytest.mark.parametrize("namespaces", ["", "team-a"])
+def test_namespace_scope_component(
+    namespaces,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the admission policy is only applied when the namespaces are restricted."""
+    # Arrange
+    harness.set_leader(True)
+    harness.update_config({"namespaces": namespaces})
+    harness.begin()
+
+    # Act
+    harness.charm.namespace_scope.component.configure_charm(None)
+
+    # Assert
+    assert harness.charm.namespace_scope.component.get_status() == ActiveStatus()
+    if namespaces:
+        applied = [c.args[0] for c in mocked_lightkube_client.apply.call_args_list]
+        assert [resource.kind for resource in applied] == [
+            "ValidatingAdmissionPolicy",
+            "ValidatingAdmissionPolicyBinding",
+        ]
+        assert (
+            "namespaceObject.metadata.name in ['team-a']"
+            in applied[0].spec.validations[0].expression
+        )
+        mocked_lightkube_client.delete.assert_not_called()
+    else:
+        mocked_lightkube_client.apply.assert_not_called()
+        assert mocked_lightkube_client.delete.call_count == 2
+
+
+def test_namespace_scope_component_missing_api(
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the status names the required API when the admission policy does not exist."""
+    # Arrange
+    harness.set_leader(True)
+    harness.update_config({"namespaces": "team-a"})
+    harness.begin()
+    mocked_lightkube_client.get.side_effect = _api_error(404)
+
+    # Act
+    status = harness.charm.namespace_scope.component.get_status()
+
+    # Assert
+    assert status == BlockedStatus(
+        "Restricting namespaces requires the admissionregistration.k8s.io/v1 "
+        "ValidatingAdmissionPolicy API (Kubernetes 1.30+)"
+    )
+
+
+@pytest.mark.parametrize(
+    "config,expected_message",
+    [
+        ({"namespaces": "Team_A"}, "Invalid namespace name 'Team_A' in namespaces"),
+        ({"namespace-selector": "shard"}, "Invalid namespace-selector requirement 'shard'"),
+        ({"kueue-queue-name": "Katib_Trials"}, "Invalid kueue-queue-name 'Katib_Trials'"),
+        (
+            {"gang-scheduler": "yunikorn"},
+            "Invalid gang-scheduler 'yunikorn', expected one of ['scheduler-plugins', 'volcano']",
+        ),
+    ],
+)
+def test_invalid_config_status(
+    config,
+    expected_message,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the unit status names the invalid config option and its value."""
+    # Arrange
+    harness.set_leader(True)
+    harness.update_config(config)
+    harness.begin_with_initial_hooks()
+
+    # Act
+    harness.charm.on.config_changed.emit()
+
+    # Assert
+    assert harness.charm.model.unit.status == BlockedStatus(
+        f"[config-validation] {expected_message}"
+    )
+    mocked_lightkube_client.apply.assert_not_called()
+
+
+@pytest.mark.parametrize("kueue_queue_name", ["", "katib-trials"])
+def test_default_trial_templates_kueue_queue(
+    kueue_queue_name,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the default trial templates are labelled with the configured Kueue queue."""
+    # Arrange
+    harness.update_config({"kueue-queue-name": kueue_queue_name})
+    harness.begin()
+    krh = harness.charm.kubernetes_resources.component._get_kubernetes_resource_handler()
+
+    # Act
+    trial_template = next(
+        r for r in krh.render_manifests() if r.metadata and r.metadata.name == "trial-template"
+    )
+
+    # Assert
+    for template in trial_template.data.values():
+        labels = (yaml.safe_load(template).get("metadata") or {}).get("labels", {})
+        if kueue_queue_name:
+            assert labels == {"kueue.x-k8s.io/queue-name": kueue_queue_name}
+        else:
+            assert labels == {}
+
+
+@pytest.mark.parametrize(
+    "gang_scheduler,expected_scheduler_name",
+    [("", None), ("volcano", "volcano"), ("scheduler-plugins", "scheduler-plugins-scheduler")],
+)
+def test_pytorchjob_trial_template_gang_scheduling(
+    gang_scheduler,
+    expected_scheduler_name,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the PyTorchJob trial template is set up for the configured gang scheduler."""
+    # Arrange
+    harness.update_config({"gang-scheduler": gang_scheduler})
+    harness.begin()
+    krh = harness.charm.kubernetes_resources.component._get_kubernetes_resource_handler()
+
+    # Act
+    trial_template = next(
+        r for r in krh.render_manifests() if r.metadata and r.metadata.name == "trial-template"
+    )
+
+    # Assert
+    spec = yaml.safe_load(trial_template.data["pytorchJobTemplate"])["spec"]
+    for replica_spec in spec["pytorchReplicaSpecs"].values():
+        assert replica_spec["template"]["spec"].get("schedulerName") == expected_scheduler_name
+    if expected_scheduler_name:
+        replicas = sum(r["replicas"] for r in spec["pytorchReplicaSpecs"].values())
+        assert spec["runPolicy"]["schedulingPolicy"]["minAvailable"] == replicas == 3
+    else:
+        assert "runPolicy" not in spec
+
+
+NOW = datetime(2026, 1, 31, tzinfo=timezone.utc)
+
+
+def make_experiment(name: str, namespace: str, condition: str, days_ago: int) -> Experiment:
+    """Return an Experiment with the given condition, finished days_ago days before NOW."""
+    finished_at = (NOW - timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return Experiment(
+        metadata=ObjectMeta(name=name, namespace=namespace),
+        status={
+            "completionTime": finished_at if condition != "Running" else None,
+            "conditions": [
+                {"type": condition, "status": "True", "lastTransitionTime": finished_at}
+            ],
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    "max_age,max_count,statuses,expected_names",
+    [
+        # Age-based: only experiments finished more than 7 days ago
+        (timedelta(days=7), 0, ("Succeeded", "Failed"), ["old-failed", "old-succeeded"]),
+        # Count-based: keep the most recent finished experiment of each namespace
+        (None, 1, ("Succeeded", "Failed"), ["old-failed", "old-succeeded", "recent-b"]),
+        # Status filter: failed experiments only
+        (timedelta(days=7), 0, ("Failed",), ["old-failed"]),
+    ],
+)
+def test_select_expired_experiments(max_age, max_count, statuses, expected_names):
+    """Test that the retention policy expires finished experiments, oldest first."""
+    # Arrange
+    experiments = [
+        make_experiment("recent-a", "ns-a", "Succeeded", 1),
+        make_experiment("old-succeeded", "ns-a", "Succeeded", 10),
+        make_experiment("old-failed", "ns-a", "Failed", 30),
+        make_experiment("running", "ns-a", "Running", 40),
+        make_experiment("newest-b", "ns-b", "Succeeded", 0),
+        make_experiment("recent-b", "ns-b", "Failed", 2),
+    ]
+    policy = RetentionPolicy(
+        max_age=max_age, max_count=max_count, statuses=statuses, batch_size=10
+    )
+
+    # Act
+    expired = select_expired_experiments(experiments, policy, NOW)
+
+    # Assert
+    assert [experiment.metadata.name for experiment in expired] == expected_names
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"experiment-retention-days": -1},
+        {"experiment-gc-batch-size": 0},
+        {"experiment-retention-statuses": "Succeeded,Running"},
+    ],
+)
+def test_retention_policy_invalid_config(config, harness):
+    """Test that an invalid retention policy config is rejected."""
+    harness.update_config(config)
+
+    with pytest.raises(ValueError):
+        RetentionPolicy.from_config(harness.model.config)
+
+
+@pytest.mark.parametrize("dry_run", [True, False])
+def test_prune_experiments_action(
+    dry_run,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the prune-experiments action deletes one batch of expired experiments."""
+    # Arrange
+    harness.update_config({"experiment-retention-count": 1, "experiment-gc-batch-size": 1})
+    harness.begin()
+    mocked_lightkube_client.list.return_value = [
+        make_experiment("newest", "ns-a", "Succeeded", 0),
+        make_experiment("older", "ns-a", "Succeeded", 1),
+        make_experiment("oldest", "ns-a", "Failed", 2),
+    ]
+
+    # Act
+    output = harness.run_action("prune-experiments", {"dry-run": dry_run})
+
+    # Assert
+    assert output.results == {"experiments": "ns-a/oldest", "count": 1}
+    if dry_run:
+        mocked_lightkube_client.delete.assert_not_called()
+    else:
+        mocked_lightkube_client.delete.assert_called_once_with(
+            Experiment, "oldest", namespace="ns-a"
+        )
+
+
+def test_prune_experiments_action_disabled(
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the prune-experiments action fails when no retention policy is set."""
+    harness.begin()
+
+    with pytest.raises(ActionFailed):
+        harness.run_action("prune-experiments", {"dry-run": True})
+
+
+OBJECTIVE = {"type": "maximize", "objectiveMetricName": "accuracy"}
+
+
+def make_trial(name: str, accuracy: float = None, keep: bool = False) -> Trial:
+    """Return a Succeeded Trial that reported the given accuracy."""
+    metrics = []
+    if accuracy is not None:
+        metrics = [{"name": "accuracy", "min": "0.1", "max": str(accuracy), "latest": "0.2"}]
+    return Trial(
+        metadata=ObjectMeta(
+            name=name,
+            namespace="ns-a",
+            annotations={"katib.kubeflow.org/keep": "true"} if keep else None,
+        ),
+        status={
+            "conditions": [{"type": "Succeeded", "status": "True"}],
+            "observation": {"metrics": metrics},
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    "objective,expected_names",
+    [
+        # Best accuracy is the max, trials without metrics rank last
+        (OBJECTIVE, ["low", "no-metrics"]),
+        # Lowest max is best: the annotated trial is also among the top-K
+        (
+            {
+                **OBJECTIVE,
+                "type": "minimize",
+                "metricStrategies": [{"name": "accuracy", "value": "max"}],
+            },
+            ["medium", "best", "no-metrics"],
+        ),
+    ],
+)
+def test_select_trials_to_delete(objective, expected_names):
+    """Test that trials outside of the top-K and not annotated to keep are deleted."""
+    trials = [
+        make_trial("low", 0.5),
+        make_trial("kept", 0.4, keep=True),
+        make_trial("best", 0.9),
+        make_trial("medium", 0.7),
+        make_trial("no-metrics"),
+    ]
+
+    to_delete = select_trials_to_delete(trials, objective, top_k=2)
+
+    assert [trial.metadata.name for trial in to_delete] == expected_names
+
+
+@pytest.mark.parametrize("dry_run", [True, False])
+def test_compact_trials_action(
+    dry_run,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the compact-trials action summarizes the experiment and deletes trials."""
+    # Arrange
+    harness.update_config({"trial-retention-top-k": 1})
+    harness.begin()
+    experiment = make_experiment("sweep", "ns-a", "Succeeded", 1)
+    experiment.spec = {"objective": OBJECTIVE}
+    experiment.status["trials"] = 2
+    trials = [make_trial("best", 0.9), make_trial("worst", 0.1)]
+    mocked_lightkube_client.list.side_effect = lambda resource, **kwargs: (
+        [experiment] if resource is Experiment else trials
+    )
+
+    # Act
+    output = harness.run_action("compact-trials", {"dry-run": dry_run})
+
+    # Assert
+    assert output.results == {"trials": "ns-a/worst", "count": 1}
+    if dry_run:
+        mocked_lightkube_client.patch.assert_not_called()
+        mocked_lightkube_client.delete.assert_not_called()
+    else:
+        summary_patch, compacted_patch = (
+            c.args[2] for c in mocked_lightkube_client.patch.call_args_list
+        )
+        summary = json.loads(summary_patch["metadata"]["annotations"][TRIAL_SUMMARY_ANNOTATION])
+        assert summary == {
+            "trials": 2,
+            "succeeded": 2,
+            "objective": {"metricName": "accuracy", "min": 0.1, "max": 0.9, "mean": 0.5},
+        }
+        assert json.loads(
+            compacted_patch["metadata"]["annotations"][TRIALS_COMPACTED_ANNOTATION]
+        ) == {"topK": 1, "trials": 2}
+        mocked_lightkube_client.delete.assert_called_once_with(Trial, "worst", namespace="ns-a")
+
+
+def test_compact_trials_skips_compacted_experiments(
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the Trials of an already compacted experiment are not listed again."""
+    # Arrange
+    harness.update_config({"trial-retention-top-k": 1})
+    harness.begin()
+    experiment = make_experiment("sweep", "ns-a", "Succeeded", 1)
+    experiment.status["trials"] = 2
+    experiment.metadata.annotations = {
+        TRIALS_COMPACTED_ANNOTATION: json.dumps({"topK": 1, "trials": 2})
+    }
+    mocked_lightkube_client.list.return_value = [experiment]
+
+    # Act
+    output = harness.run_action("compact-trials", {"dry-run": False})
+
+    # Assert
+    assert output.results == {"trials": "", "count": 0}
+    mocked_lightkube_client.list.assert_called_once_with(Experiment, namespace="*")
+    mocked_lightkube_client.patch.assert_not_called()
+
+
+@pytest.mark.parametrize("resume_policy", ["LongRunning", "FromVolume"])
+def test_compact_trials_skips_resumable_experiments(
+    resume_policy,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the Trials of an experiment which can be resumed are not deleted."""
+    # Arrange
+    harness.update_config({"trial-retention-top-k": 1})
+    harness.begin()
+    experiment = make_experiment("sweep", "ns-a", "Succeeded", 1)
+    experiment.spec = {"objective": OBJECTIVE, "resumePolicy": resume_policy}
+    experiment.status["trials"] = 2
+    mocked_lightkube_client.list.return_value = [experiment]
+
+    # Act
+    output = harness.run_action("compact-trials", {"dry-run": False})
+
+    # Assert
+    assert output.results == {"trials": "", "count": 0}
+    mocked_lightkube_client.list.assert_called_once_with(Experiment, namespace="*")
+    mocked_lightkube_client.patch.assert_not_called()
+    mocked_lightkube_client.delete.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "resume_policy,expected_status",
+    [
+        ("", ActiveStatus()),
+        ("Never", ActiveStatus()),
+        (
+            "Sometimes",
+            BlockedStatus(
+                "Invalid default-resume-policy 'Sometimes', expected one of "
+                "['Never', 'LongRunning', 'FromVolume']"
+            ),
+        ),
+    ],
+)
+def test_default_resume_policy_component(
+    resume_policy,
+    expected_status,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the admission policy is applied when configured and deleted otherwise."""
+    # Arrange
+    harness.set_leader(True)
+    harness.update_config({"default-resume-policy": resume_policy})
+    harness.begin()
+
+    # Act
+    harness.charm.default_resume_policy.component.configure_charm(None)
+
+    # Assert
+    assert harness.charm.default_resume_policy.component.get_status() == expected_status
+    if resume_policy == "Never":
+        applied = [c.args[0] for c in mocked_lightkube_client.apply.call_args_list]
+        assert [resource.kind for resource in applied] == [
+            "MutatingAdmissionPolicy",
+            "MutatingAdmissionPolicyBinding",
+        ]
+        assert (
+            "resumePolicy: 'Never'" in applied[0].spec.mutations[0].applyConfiguration.expression
+        )
+        mocked_lightkube_client.delete.assert_not_called()
+    else:
+        mocked_lightkube_client.apply.assert_not_called()
+        assert mocked_lightkube_client.delete.call_count == 2
+
+
+def test_default_resume_policy_component_missing_api(
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the status names the required API when the admission policy does not exist."""
+    # Arrange
+    harness.set_leader(True)
+    harness.update_config({"default-resume-policy": "Never"})
+    harness.begin()
+    mocked_lightkube_client.get.side_effect = _api_error(404)
+
+    # Act
+    status = harness.charm.default_resume_policy.component.get_status()
+
+    # Assert
+    assert status == BlockedStatus(
+        "default-resume-policy requires the admissionregistration.k8s.io/v1beta1 "
+        "MutatingAdmissionPolicy API (MutatingAdmissionPolicy feature gate)"
+    )
+
+
+def test_cleanup_suggestions_action(
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that only the Suggestions of finished LongRunning experiments are cleaned up."""
+    # Arrange
+    harness.begin()
+    experiments = [
+        make_experiment("finished", "ns-a", "Succeeded", 1),
+        make_experiment("running", "ns-a", "Running", 1),
+        make_experiment("never", "ns-a", "Succeeded", 1),
+        make_experiment("from-volume", "ns-a", "Succeeded", 1),
+    ]
+    for experiment, resume_policy in zip(
+        experiments, ["LongRunning", "LongRunning", None, "FromVolume"]
+    ):
+        experiment.spec = {"resumePolicy": resume_policy}
+    suggestions = [
+        Suggestion(
+            metadata=ObjectMeta(name=name, namespace="ns-a"),
+            status={"conditions": [{"type": "DeploymentReady", "status": "True"}]},
+        )
+        for name in ("finished", "running", "never", "from-volume")
+    ]
+    mocked_lightkube_client.list.side_effect = lambda resource, **kwargs: (
+        experiments if resource is Experiment else suggestions
+    )
+
+    # Act
+    output = harness.run_action("cleanup-suggestions", {"dry-run": False})
+
+    # Assert
+    assert output.results == {"suggestions": "ns-a/finished", "count": 1}
+    mocked_lightkube_client.delete.assert_called_once_with(
+        Suggestion, "finished", namespace="ns-a"
+    )
+
+
+@pytest.mark.parametrize("enabled,trials", [(True, True), (True, False), (False, False)])
+def test_state_metrics_component(
+    enabled,
+    trials,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that kube-state-metrics is deployed and scraped when enabled, deleted otherwise."""
+    # Arrange
+    harness.set_leader(True)
+    harness.set_model_name(TEST_NAMESPACE)
+    harness.update_config({"state-metrics": enabled, "state-metrics-trials": trials})
+    relation_id = harness.add_relation("metrics-endpoint", "prometheus")
+    harness.add_relation_unit(relation_id, "prometheus/0")
+    harness.begin()
+
+    # Act
+    harness.charm.state_metrics.component.configure_charm(None)
+    harness.charm.on.config_changed.emit()
+
+    # Assert
+    scrape_jobs = json.loads(
+        harness.get_relation_data(relation_id, harness.charm.app.name)["scrape_jobs"]
+    )
+    state_metrics_jobs = [job for job in scrape_jobs if "state_metrics" in job["job_name"]]
+    applied = {
+        c.args[0].kind: c.args[0]
+        for c in mocked_lightkube_client.apply.call_args_list
+        if c.args and c.args[0].metadata.name == "katib-controller-state-metrics"
+    }
+    if enabled:
+        assert state_metrics_jobs[0]["static_configs"][0]["targets"] == [
+            f"katib-controller-state-metrics.{TEST_NAMESPACE}.svc:8080"
+        ]
+        deployment = applied["Deployment"]
+        assert (
+            deployment.spec.template.spec.containers[0].image
+            == IMAGES_CONTEXT["katib_state_metrics"]
+        )
+        config = yaml.safe_load(applied["ConfigMap"].data["custom-resource-state.yaml"])
+        assert [
+            resource["groupVersionKind"]["kind"] for resource in config["spec"]["resources"]
+        ] == (["Experiment", "Trial", "Suggestion"] if trials else ["Experiment", "Suggestion"])
+    else:
+        assert not state_metrics_jobs
+        assert not applied
+        deleted = [c.args[1] for c in mocked_lightkube_client.delete.call_args_list if c.args]
+        assert deleted.count("katib-controller-state-metrics") == 6
+
+
+def make_deployment(ready_replicas: int) -> Deployment:
+    """Return a Deployment with the given number of ready replicas."""
+    return Deployment(
+        spec=DeploymentSpec(selector=LabelSelector(), template=PodTemplateSpec()),
+        status=DeploymentStatus(readyReplicas=ready_replicas),
+    )
+
+
+@pytest.mark.parametrize(
+    "get_side_effect,expected_status",
+    [
+        (
+            lambda resource, name, namespace=None: make_deployment(ready_replicas=0),
+            WaitingStatus("Waiting for kube-state-metrics to be ready"),
+        ),
+        (
+            lambda resource, name, namespace=None: make_deployment(ready_replicas=1),
+            ActiveStatus(),
+        ),
+        (
+            _api_error(404),
+            BlockedStatus("kube-state-metrics resources are missing, see logs"),
+        ),
+    ],
+)
+def test_state_metrics_component_status(
+    get_side_effect,
+    expected_status,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that the status reflects whether the kube-state-metrics resources are ready."""
+    # Arrange
+    harness.set_leader(True)
+    harness.update_config({"state-metrics": True})
+    harness.begin()
+    mocked_lightkube_client.get.side_effect = get_side_effect
+
+    # Act
+    status = harness.charm.state_metrics.component.get_status()
+
+    # Assert
+    assert status == expected_status
+
+
+DEFAULT_DROP_RELABEL_CONFIG = {
+    "source_labels": ["__name__"],
+    "regex": "rest_client_.+_bucket|workqueue_work_duration_seconds_bucket",
+    "action": "drop",
+}
+
+
+@pytest.mark.parametrize(
+    "config, expected_settings",
+    [
+        ({}, {"metric_relabel_configs": [DEFAULT_DROP_RELABEL_CONFIG]}),
+        (
+            {
+                "metrics-scrape-interval": "2m",
+                "metrics-scrape-timeout": "30s",
+                "metrics-drop-regex": "",
+                "metrics-keep-regex": "controller_runtime_.+|workqueue_depth",
+            },
+            {
+                "scrape_interval": "2m",
+                "scrape_timeout": "30s",
+                "metric_relabel_configs": [
+                    {
+                        "source_labels": ["__name__"],
+                        "regex": "katib_.+|controller_runtime_.+|workqueue_depth",
+                        "action": "keep",
+                    }
+                ],
+            },
+        ),
+        # Invalid settings fall back to the Prometheus defaults, and block the unit
+        ({"metrics-scrape-interval": "30s", "metrics-scrape-timeout": "1m"}, {}),
+        ({"metrics-scrape-interval": "30"}, {}),
+        ({"metrics-drop-regex": "go_(.+"}, {}),
+        ({"metrics-keep-regex": "(?!go_).+"}, {}),
+    ],
+)
+def test_metrics_scrape_settings(
+    config, expected_settings, harness, mocked_lightkube_client, mocked_kubernetes_service_patch
+):
+    """Test that the scrape settings of the controller metrics job are set from the config."""
+    # Arrange
+    harness.update_config(config)
+    relation_id = harness.add_relation("metrics-endpoint", "prometheus")
+    harness.add_relation_unit(relation_id, "prometheus/0")
+    harness.set_leader(True)
+    harness.begin()
+
+    # Act
+    harness.charm.on.config_changed.emit()
+
+    # Assert
+    scrape_jobs = json.loads(
+        harness.get_relation_data(relation_id, harness.charm.app.name)["scrape_jobs"]
+    )
+    controller_job = next(
+        job for job in scrape_jobs if job["job_name"].endswith("katib_controller_metrics")
+    )
+    settings = {
+        key: value
+        for key, value in controller_job.items()
+        if key in ("scrape_interval", "scrape_timeout", "metric_relabel_configs")
+    }
+    assert settings == expected_settings
+
+
+@pytest.mark.parametrize(
+    "config,expected_message",
+    [
+        (
+            {"metrics-keep-regex": "(?!go_).+"},
+            "Invalid metrics-keep-regex '(?!go_).+': Prometheus does not support negative "
+            "lookahead",
+        ),
+        (
+            {"metrics-drop-regex": "(rest)_client_\\1"},
+            "Invalid metrics-drop-regex '(rest)_client_\\1': Prometheus does not support "
+            "backreference",
+        ),
+        (
+            {"metrics-drop-regex": "go_.++"},
+            "Invalid metrics-drop-regex 'go_.++': Prometheus does not support possessive "
+            "quantifier",
+        ),
+        (
+            {"metrics-scrape-interval": "30s", "metrics-scrape-timeout": "1m"},
+            "metrics-scrape-timeout (1m) exceeds metrics-scrape-interval (30s)",
+        ),
+    ],
+)
+def test_metrics_scrape_settings_invalid_status(
+    config,
+    expected_message,
+    harness,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patch,
+    mocked_service_mesh_component,
+):
+    """Test that invalid scrape settings are reported, without stopping the reconciliation."""
+    # Arrange
+    harness.update_config(config)
+    harness.begin()
+
+    # Act
+    status = harness.charm.metrics_scrape_config.component.get_status()
+
+    # Assert
+    assert status == BlockedStatus(expected_message)
+    assert harness.charm.config_validation.component.get_status() == ActiveStatus()
+
+
+@pytest.mark.parametrize(
+    "regex", ["[(?=]x", "a\\(?=b", "(?P<name>x)(?:y)", "\\0", "a+?b*?", "[]+]+"]
+)
+def test_metrics_regex_re2_supported(
+    regex, harness, mocked_lightkube_client, mocked_kubernetes_service_patch
+):
+    """Test that regexes whose syntax RE2 supports are accepted."""
+    # Arrange
+    harness.update_config({"metrics-drop-regex": regex})
+    harness.begin()
+
+    # Act
+    settings = harness.charm._scrape_job_settings()
+
+    # Assert
+    assert settings["metric_relabel_configs"][0]["regex"] == regex
@@ -3,22 +3,50 @@
 # See LICENSE file for licensing details.
 
 import logging
+import time
+from datetime import timedelta
+from functools import partial
+from typing import Optional, Tuple
 
+import pymysql
 from charmed_kubeflow_chisme.exceptions import ErrorWithStatus, GenericCharmRuntimeError
 from charmed_kubeflow_chisme.kubernetes import KubernetesResourceHandler
 from charmed_kubeflow_chisme.lightkube.batch import delete_many
 from charmed_kubeflow_chisme.pebble import update_layer
 from charms.data_platform_libs.v0.data_interfaces import DatabaseRequires
+from charms.grafana_k8s.v0.grafana_dashboard import GrafanaDashboardProvider
 from charms.loki_k8s.v1.loki_push_api import LogForwarder
 from charms.mlops_libs.v0.k8s_service_info import KubernetesServiceInfoProvider
+from charms.observability_libs.v0.kubernetes_compute_resources_patch import (
+    KubernetesComputeResourcesPatch,
+    ResourceRequirements,
+    adjust_resource_requirements,
+)
 from charms.observability_libs.v1.kubernetes_service_patch import KubernetesServicePatch
+from charms.prometheus_k8s.v0.prometheus_scrape import MetricsEndpointProvider
 from lightkube import ApiError
 from lightkube.generic_resource import load_in_cluster_generic_resources
 from lightkube.models.core_v1 import ServicePort
 from ops.charm import CharmBase
 from ops.main import main
 from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus, ModelError, WaitingStatus
-from ops.pebble import CheckStatus, Layer
+from ops.pebble import ChangeError, CheckStatus, Layer
+
+from db_connection import connect_timeout_args, parse_duration
+from db_endpoints import order_by_availability, parse_endpoints
+from db_readiness import wait_for_database, wait_until_reachable
+from db_schema import get_table_sizes, verify_indexes
+from go_runtime import go_runtime_environment
+from observation_log_export import export_observation_logs, get_trial_experiments
+from observation_logs import (
+    compact_observation_logs,
+    connect,
+    get_completed_trial_names,
+    get_trial_names,
+    prune_observation_logs,
+)
+from partitioning import is_migrated, migrate_step, rotate_partitions
+from profiling import capture_profile
 
 K8S_RESOURCE_FILES = [
     "src/templates/auth_manifests.yaml.j2",
@@ -26,6 +54,13 @@ K8S_RESOURCE_FILES = [
 # Value is hardcoded in upstream
 # https://github.com/kubeflow/katib/blob/7959ffd54851216dbffba791e1da13c8485d1085/cmd/db-manager/v1beta1/main.go#L38
 SERVICE_PORT = 6789
+# Maximum number of delete transactions per observation-log pruning run
+OBSERVATION_LOGS_MAX_BATCHES = 100
+# Seconds an update-status hook may spend on the charm and the observation_logs maintenance,
+# shared by all its steps so that the hook queue of the unit is not blocked for minutes
+UPDATE_STATUS_TIME_BUDGET = 60
+# Maximum time to wait for the workload to accept connections after a restart, in seconds
+WORKLOAD_READY_TIMEOUT = 30
 
 
 class KatibDBManagerOperator(CharmBase):
@@ -54,6 +89,17 @@ class KatibDBManagerOperator(CharmBase):
         self.framework.observe(self.on.install, self._on_install)
         self.framework.observe(self.on.remove, self._on_remove)
         self.framework.observe(self.on.update_status, self._on_update_status)
+        self.framework.observe(self.on.capture_profile_action, self._on_capture_profile)
+        self.framework.observe(
+            self.on.prune_observation_logs_action, self._on_prune_observation_logs
+        )
+        self.framework.observe(
+            self.on.compact_observation_logs_action, self._on_compact_observation_logs
+        )
+        self.framework.observe(self.on.verify_indexes_action, self._on_verify_indexes)
+        self.framework.observe(
+            self.on.export_observation_logs_action, self._on_export_observation_logs
+        )
         self.framework.observe(
             self.on["relational-db"].relation_joined, self._on_relational_db_relation
         )
@@ -67,6 +113,11 @@ class KatibDBManagerOperator(CharmBase):
             self.on["relational-db"].relation_broken, self._on_relational_db_relation_remove
         )
 
+        # the StatefulSet is patched by the library, its status is checked in _on_event
+        self.resources_patch = KubernetesComputeResourcesPatch(
+            self, self._container_name, resource_reqs_func=self._resource_requirements
+        )
+
         # setup relational database interface and observers
         self.database = DatabaseRequires(
             self, relation_name="relational-db", database_name=self._database_name
@@ -89,8 +140,23 @@ class KatibDBManagerOperator(CharmBase):
             refresh_event=self.on.config_changed,
         )
 
+        self.prometheus_provider = MetricsEndpointProvider(
+            charm=self,
+            jobs=self._scrape_jobs,
+            refresh_event=self.on.config_changed,
+        )
+        self.dashboard_provider = GrafanaDashboardProvider(self)
+
         self._logging = LogForwarder(charm=self)
 
+    @property
+    def _scrape_jobs(self) -> list:
+        """Return the scrape job of the workload metrics endpoint."""
+        metrics_port = int(self.model.config["metrics-port"])
+        # An empty list of jobs would make the library scrape port 80 instead
+        targets = [f"*:{metrics_port}"] if metrics_port else []
+        return [{"job_name": "katib_db_manager_metrics", "static_configs": [{"targets": targets}]}]
+
     @property
     def container(self):
         return self._container
@@ -121,7 +187,11 @@ class KatibDBManagerOperator(CharmBase):
 
     @property
     def service_environment(self):
-        """Return environment variables based on model configuration."""
+        """Return environment variables based on model configuration.
+
+        Only the database endpoint in use is passed to the workload, so that a change of the other
+        advertised endpoints does not change the plan and restart it.
+        """
         ret_env_vars = {
             "DB_NAME": self._db_data["db_type"],
             "DB_USER": self._db_data["db_username"],
@@ -130,6 +200,13 @@ class KatibDBManagerOperator(CharmBase):
             "KATIB_MYSQL_DB_PORT": self._db_data["katib_db_port"],
             "KATIB_MYSQL_DB_DATABASE": self._db_data["katib_db_name"],
         }
+        ret_env_vars.update(
+            go_runtime_environment(
+                self.container,
+                gomaxprocs=int(self.model.config["gomaxprocs"]),
+                gomemlimit=self.model.config["gomemlimit"],
+            )
+        )
 
         return ret_env_vars
 
@@ -144,26 +221,27 @@ class KatibDBManagerOperator(CharmBase):
                     "override": "merge",
                     "summary": "Pebble service for katib-db-manager operator",
                     "startup": "enabled",
-                    "command": self._exec_command,
+                    "command": self._workload_command,
                     "environment": self.service_environment,
-                    # Disable health checks due to issue #128.
-                    # FIXME: uncomment when https://github.com/canonical/katib-operators/issues/128 is closed.  # noqa E501
-                    # "on-check-failure": {"katib-db-manager-up": "restart"},
+                    "on-check-failure": {"katib-db-manager-up": "restart"},
+                    # Time given to in-flight calls after SIGTERM, before the old process is killed
+                    "kill-delay": self.model.config["shutdown-grace-period"],
                 },
             },
-            # Disable health checks due to issue #128.
-            # FIXME: uncomment when https://github.com/canonical/katib-operators/issues/128 is closed.  # noqa E501
-            # "checks": {
-            #     "katib-db-manager-up": {
-            #         "override": "replace",
-            #         "period": "60s",
-            #         "timeout": "20s",
-            #         "threshold": 5,
-            #         "exec": {
-            #             "command": f"/bin/grpc_health_probe -addr=:{self._port}",
-            #         },
-            #     }
-            # },
+            # A TCP check is run by Pebble itself, unlike grpc_health_probe which is forked on
+            # every period and is not shipped in all the workload images (issue #128). As a
+            # ready check, it also takes the pod out of the Service endpoints while it fails,
+            # and on-check-failure restarts the service once it reaches the threshold.
+            "checks": {
+                "katib-db-manager-up": {
+                    "override": "replace",
+                    "level": "ready",
+                    "period": self.model.config["health-check-period"],
+                    "timeout": self.model.config["health-check-timeout"],
+                    "threshold": int(self.model.config["health-check-threshold"]),
+                    "tcp": {"port": SERVICE_PORT},
+                }
+            },
         }
         return Layer(layer_config)
 
@@ -221,10 +299,23 @@ class KatibDBManagerOperator(CharmBase):
                 db_data["db_type"] = "mysql"
                 db_data["db_username"] = val["username"]
                 db_data["db_password"] = val["password"]
-                host, port = val["endpoints"].split(":")
-                db_data["katib_db_host"] = host
-                db_data["katib_db_port"] = port
+                # Endpoints are ordered for failover, the workload only connects to the first one.
+                # The read-only endpoints are only used by the charm to read observation logs.
+                endpoints = order_by_availability(
+                    parse_endpoints(val["endpoints"]), preferred=self._current_db_endpoint()
+                )
+                read_only_endpoints = parse_endpoints(val.get("read-only-endpoints", ""))
+                if not endpoints:
+                    raise ValueError("no endpoint advertised")
+                db_data["katib_db_host"], db_data["katib_db_port"] = endpoints[0]
+                db_data["katib_db_read_only_endpoints"] = read_only_endpoints
                 db_data["katib_db_name"] = self._database_name
+            except ValueError as err:
+                self.logger.error(f"Invalid endpoints in relational-db relation data: {err}")
+                raise ErrorWithStatus(
+                    "Incorrect/incomplete data found in relation relational-db. See logs",
+                    WaitingStatus,
+                )
             except KeyError as err:
                 self.logger.error(f"Missing attribute {err} in relational-db relation data")
                 # incorrect/incomplete data can be found in relational-db relation which can be
@@ -256,6 +347,90 @@ class KatibDBManagerOperator(CharmBase):
 
         return db_data
 
+    @property
+    def _workload_command(self) -> str:
+        """Return the workload command, with the database connect timeout from the config."""
+        return " ".join(
+            [self._exec_command, *connect_timeout_args(self.model.config["db-connect-timeout"])]
+        )
+
+    def _check_pebble_config(self) -> None:
+        """Check the health check, shutdown and command config before they reach Pebble."""
+        try:
+            period = parse_duration(self.model.config["health-check-period"])
+            timeout = parse_duration(self.model.config["health-check-timeout"])
+            parse_duration(self.model.config["shutdown-grace-period"])
+            connect_timeout_args(self.model.config["db-connect-timeout"])
+        except ValueError as err:
+            raise ErrorWithStatus(f"Invalid Pebble config: {err}", BlockedStatus)
+        if timeout >= period:
+            raise ErrorWithStatus(
+                "health-check-timeout must be shorter than health-check-period", BlockedStatus
+            )
+        if int(self.model.config["health-check-threshold"]) < 1:
+            raise ErrorWithStatus("health-check-threshold must be positive", BlockedStatus)
+
+    def _current_db_endpoint(self) -> Optional[tuple]:
+        """Return the database endpoint in the current Pebble plan, if the service is planned."""
+        if not self._container.can_connect():
+            return None
+        service = self._container.get_plan().services.get(self._container_name)
+        if service is None or "KATIB_MYSQL_DB_HOST" not in service.environment:
+            return None
+        return (
+            service.environment["KATIB_MYSQL_DB_HOST"],
+            service.environment["KATIB_MYSQL_DB_PORT"],
+        )
+
+    def _is_replan_pending(self) -> bool:
+        """Return True if the workload would be (re)started by updating the Pebble layer."""
+        if not self._container.can_connect():
+            return False
+        return self._container.get_plan().services != self._katib_db_manager_layer.services
+
+    def _update_checks(self) -> None:
+        """Update the Pebble checks of the plan if changed.
+
+        update_layer only compares the services, so a change of the health check config alone
+        would otherwise never reach the plan.
+        """
+        layer = self._katib_db_manager_layer
+        if self._container.get_plan().checks == layer.checks:
+            return
+        self._container.add_layer(self._container_name, layer, combine=True)
+        try:
+            self.logger.info("Pebble checks updated with new configuration, replanning")
+            self._container.replan()
+        except ChangeError as err:
+            self.logger.error(f"Failed to replan: {err}")
+            raise ErrorWithStatus("Failed to replan", BlockedStatus)
+
+    def _wait_for_workload(self) -> None:
+        """Wait for the restarted workload to accept connections on its gRPC port.
+
+        The workload container shares the network namespace of the pod, so the port is probed
+        on localhost.
+        """
+        if not wait_until_reachable(("localhost", str(SERVICE_PORT)), WORKLOAD_READY_TIMEOUT):
+            raise ErrorWithStatus(
+                "Waiting for katib-db-manager to accept connections", WaitingStatus
+            )
+
+    def _wait_for_database(self) -> None:
+        """Wait for the database to be ready before the workload is started or replanned.
+
+        katib-db-manager exits if it cannot connect, e.g. while MySQL is still creating the user
+        of a new relation, and Pebble then delays its restarts with a growing backoff.
+        """
+        timeout = int(self.model.config["db-warmup-timeout"])
+        if not timeout:
+            return
+        try:
+            wait_for_database(self._db_data, timeout)
+        except pymysql.MySQLError as err:
+            self.logger.warning(f"Katib database not ready after {timeout}s: {err}")
+            raise ErrorWithStatus("Waiting for the database to accept connections", WaitingStatus)
+
     def _check_and_report_k8s_conflict(self, error):
         """Return True if error status code is 409 (conflict), False otherwise."""
         if error.status.code == 409:
@@ -286,6 +461,26 @@ class KatibDBManagerOperator(CharmBase):
                 raise GenericCharmRuntimeError("K8S resources creation failed") from error
         self.model.unit.status = MaintenanceStatus("K8S resources created")
 
+    def _resource_requirements(self) -> ResourceRequirements:
+        """Return the workload container resources from the cpu-* and memory-* config options."""
+        limits = {
+            resource: self.model.config[f"{resource}-limit"]
+            for resource in ("cpu", "memory")
+            if self.model.config[f"{resource}-limit"]
+        }
+        requests = {
+            resource: self.model.config[f"{resource}-request"]
+            for resource in ("cpu", "memory")
+            if self.model.config[f"{resource}-request"]
+        }
+        return adjust_resource_requirements(limits, requests, adhere_to_requests=True)
+
+    def _check_resources_patched(self) -> None:
+        """Raise an error if this unit's pod does not run with the configured resources yet."""
+        status = self.resources_patch.get_status()
+        if not isinstance(status, ActiveStatus):
+            raise ErrorWithStatus(status.message, type(status))
+
     def _get_check_status(self):
         return self.container.get_check("katib-db-manager-up").status
 
@@ -306,13 +501,47 @@ class KatibDBManagerOperator(CharmBase):
 
     def _on_update_status(self, event):
         """Update status actions."""
+        deadline = time.monotonic() + UPDATE_STATUS_TIME_BUDGET
         self._on_event(event)
-        # Disable health checks due to issue #128.
-        # FIXME: uncomment when https://github.com/canonical/katib-operators/issues/128 is closed.
-        # try:
-        #     self._refresh_status()
-        # except ErrorWithStatus as err:
-        #     self.model.unit.status = err.status
+        partitioning_progress = None
+        if self.unit.is_leader() and self.model.config["observation-log-partitioning"]:
+            try:
+                partitioning_progress = self._partition_observation_logs(deadline)
+            except (ErrorWithStatus, ValueError, pymysql.MySQLError) as err:
+                self.logger.error(f"Failed to partition observation logs: {err}")
+            if partitioning_progress is not None and isinstance(self.unit.status, ActiveStatus):
+                phase, fraction = partitioning_progress
+                self.unit.status = ActiveStatus(
+                    f"Partitioning observation_logs: {fraction:.0%} {phase}"
+                )
+        if (
+            self.unit.is_leader()
+            and self._observation_logs_pruning_enabled
+            and time.monotonic() < deadline
+        ):
+            try:
+                self._prune_observation_logs(deadline=deadline)
+            except (ApiError, ErrorWithStatus, pymysql.MySQLError) as err:
+                self.logger.error(f"Failed to prune observation logs: {err}")
+        # Rows deleted during the migration only leave the partitioned table once reconciled
+        if (
+            self.unit.is_leader()
+            and int(self.model.config["observation-log-compaction-days"]) > 0
+            and partitioning_progress is None
+            and time.monotonic() < deadline
+        ):
+            try:
+                self._compact_observation_logs(deadline=deadline)
+            except (ApiError, ErrorWithStatus, ValueError, pymysql.MySQLError) as err:
+                self.logger.error(f"Failed to compact observation logs: {err}")
+        # Only report the health check over an otherwise active status
+        if isinstance(self.unit.status, ActiveStatus):
+            try:
+                self._refresh_status()
+            except ErrorWithStatus as err:
+                self.model.unit.status = err.status
+            except GenericCharmRuntimeError as err:
+                self.logger.warning(f"{err}: {err.__cause__}")
 
     def _on_install(self, _):
         """Installation only tasks."""
@@ -333,6 +562,186 @@ class KatibDBManagerOperator(CharmBase):
 
         self.unit.status = MaintenanceStatus("K8S resources removed")
 
+    def _on_capture_profile(self, event) -> None:
+        """Capture a pprof profile from the workload and return the path it was written to."""
+        port = int(self.model.config["profiling-port"])
+        if not port:
+            event.fail("Profiling is disabled, set the profiling-port config option to enable it.")
+            return
+        try:
+            path = capture_profile(
+                port,
+                profile=event.params["profile"],
+                duration=int(event.params["duration"]),
+                name=self.app.name,
+            )
+        except (OSError, ValueError) as err:
+            event.fail(f"Failed to capture profile: {err}")
+            return
+        event.set_results({"path": str(path), "size": path.stat().st_size})
+
+    @property
+    def _observation_logs_pruning_enabled(self) -> bool:
+        return bool(
+            self.model.config["observation-log-prune-orphans"]
+            or int(self.model.config["observation-log-retention-days"]) > 0
+        )
+
+    def _prune_observation_logs(
+        self, dry_run: bool = False, deadline: Optional[float] = None
+    ) -> dict:
+        """Prune the observation logs as set by the observation-log-* config options."""
+        list_trial_names = None
+        if self.model.config["observation-log-prune-orphans"]:
+            list_trial_names = partial(get_trial_names, self.k8s_resource_handler.lightkube_client)
+        retention_days = int(self.model.config["observation-log-retention-days"])
+        if self.model.config["observation-log-partitioning"]:
+            # Retention drops whole partitions instead, see _partition_observation_logs
+            retention_days = 0
+
+        connection = connect(self._get_db_data())
+        try:
+            return prune_observation_logs(
+                connection,
+                list_trial_names=list_trial_names,
+                retention=timedelta(days=retention_days) if retention_days > 0 else None,
+                batch_size=int(self.model.config["observation-log-prune-batch-size"]),
+                max_batches=OBSERVATION_LOGS_MAX_BATCHES,
+                dry_run=dry_run,
+                deadline=deadline,
+            )
+        finally:
+            connection.close()
+
+    def _on_prune_observation_logs(self, event) -> None:
+        """Prune, or count with dry-run, the orphaned and expired observation logs."""
+        if not self._observation_logs_pruning_enabled:
+            event.fail(
+                "Pruning is disabled, set observation-log-prune-orphans or "
+                "observation-log-retention-days to enable it."
+            )
+            return
+        try:
+            pruned = self._prune_observation_logs(dry_run=bool(event.params["dry-run"]))
+        except (ApiError, ErrorWithStatus, pymysql.MySQLError) as err:
+            event.fail(f"Failed to prune observation logs: {err}")
+            return
+        event.set_results(pruned)
+
+    def _partition_observation_logs(self, deadline: float) -> Optional[Tuple[str, float]]:
+        """Migrate observation_logs to time partitions until the deadline, then rotate them.
+
+        Returns:
+            The phase of the migration and the fraction of the rows it processed while the
+            migration is in progress, None once the table is partitioned.
+        """
+        partition_days = int(self.model.config["observation-log-partition-days"])
+        if partition_days < 1:
+            raise ValueError("observation-log-partition-days must be positive")
+        retention_days = int(self.model.config["observation-log-retention-days"])
+
+        connection = connect(self._get_db_data())
+        try:
+            if not is_migrated(connection):
+                progress = migrate_step(
+                    connection, partition_days, max(deadline - time.monotonic(), 0)
+                )
+                if progress is not None:
+                    return progress
+            rotate_partitions(
+                connection,
+                partition_days,
+                retention=timedelta(days=retention_days) if retention_days > 0 else None,
+            )
+            return None
+        finally:
+            connection.close()
+
+    def _compact_observation_logs(
+        self, dry_run: bool = False, deadline: Optional[float] = None
+    ) -> dict:
+        """Downsample the observation logs of the trials completed before the configured age."""
+        trial_names = get_completed_trial_names(
+            self.k8s_resource_handler.lightkube_client,
+            older_than=timedelta(days=int(self.model.config["observation-log-compaction-days"])),
+        )
+        connection = connect(self._get_db_data())
+        try:
+            return compact_observation_logs(
+                connection,
+                trial_names,
+                keep_every=int(self.model.config["observation-log-compaction-keep-every"]),
+                max_trials=int(self.model.config["observation-log-compaction-batch-size"]),
+                dry_run=dry_run,
+                deadline=deadline,
+            )
+        finally:
+            connection.close()
+
+    def _on_compact_observation_logs(self, event) -> None:
+        """Downsample, or count with dry-run, the observation logs of old completed trials."""
+        if int(self.model.config["observation-log-compaction-days"]) <= 0:
+            event.fail("Compaction is disabled, set observation-log-compaction-days to enable it.")
+            return
+        try:
+            compacted = self._compact_observation_logs(dry_run=bool(event.params["dry-run"]))
+        except (ApiError, ErrorWithStatus, ValueError, pymysql.MySQLError) as err:
+            event.fail(f"Failed to compact observation logs: {err}")
+            return
+        event.set_results(compacted)
+
+    def _on_verify_indexes(self, event) -> None:
+        """Report table sizes and index coverage, creating the missing indexes with apply."""
+        try:
+            db_data = self._get_db_data()
+            connection = connect(db_data)
+            try:
+                database = db_data["katib_db_name"]
+                indexes = verify_indexes(connection, database, apply=bool(event.params["apply"]))
+                tables = get_table_sizes(connection, database)
+            finally:
+                connection.close()
+        except (ErrorWithStatus, pymysql.MySQLError) as err:
+            event.fail(f"Failed to verify indexes: {err}")
+            return
+
+        # Action result keys may not contain underscores
+        event.set_results(
+            {
+                "tables": {
+                    table.replace("_", "-"): {key: str(value) for key, value in size.items()}
+                    for table, size in tables.items()
+                },
+                "indexes": {
+                    table.replace("_", "-"): {
+                        index.replace("_", "-"): coverage
+                        for index, coverage in table_indexes.items()
+                    }
+                    for table, table_indexes in indexes.items()
+                },
+            }
+        )
+
+    def _on_export_observation_logs(self, event) -> None:
+        """Export the observation logs of a namespace or Experiment to a compressed CSV file."""
+        namespace = event.params["namespace"]
+        experiment = event.params.get("experiment", "")
+        try:
+            trial_experiments = get_trial_experiments(
+                self.k8s_resource_handler.lightkube_client, namespace, experiment
+            )
+            connection = connect(self._get_db_data(), read_only=True)
+            try:
+                path, rows = export_observation_logs(
+                    connection, trial_experiments, name=experiment or namespace
+                )
+            finally:
+                connection.close()
+        except (ApiError, ErrorWithStatus, OSError, pymysql.MySQLError) as err:
+            event.fail(f"Failed to export observation logs: {err}")
+            return
+        event.set_results({"path": str(path), "rows": rows, "size": path.stat().st_size})
+
     def _on_event(self, event, force_conflicts: bool = False) -> None:
         """Perform all required actions for the Charm.
 
@@ -344,12 +753,22 @@ class KatibDBManagerOperator(CharmBase):
             self._check_leader()
             self._apply_k8s_resources(force_conflicts=force_conflicts)
             self._db_data = self._get_db_data()
+            self._check_pebble_config()
+            # The new configuration is only rolled out once the database accepts it, and the
+            # unit only becomes active again once the new process serves
+            replan_pending = self._is_replan_pending()
+            if replan_pending:
+                self._wait_for_database()
             update_layer(
                 self._container_name,
                 self._container,
                 self._katib_db_manager_layer,
                 self.logger,
             )
+            self._update_checks()
+            if replan_pending:
+                self._wait_for_workload()
+            self._check_resources_patched()
         except ErrorWithStatus as err:
             self.model.unit.status = err.status
             self.logger.error(f"Failed to handle {event} with error: {err}")
@@ -0,0 +1,42 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Database connection settings of the katib-db-manager workload."""
+
+import re
+from typing import List
+
+# Go time.ParseDuration format, e.g. "90s", "5m" or "1h30m"
+GO_DURATION_PATTERN = re.compile(r"^([0-9]+(\.[0-9]+)?(ns|us|µs|ms|s|m|h))+$")
+GO_DURATION_UNITS = {"ns": 1e-9, "us": 1e-6, "µs": 1e-6, "ms": 1e-3, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value: str) -> float:
+    """Return the number of seconds of a Go duration.
+
+    Raises:
+        ValueError: if the value is not a Go duration.
+    """
+    if not GO_DURATION_PATTERN.match(value):
+        raise ValueError(f"'{value}' is not a Go duration such as '5m'")
+    return sum(
+        float(amount) * GO_DURATION_UNITS[unit]
+        for amount, _, unit in re.findall(r"([0-9]+(\.[0-9]+)?)(ns|us|µs|ms|s|m|h)", value)
+    )
+
+
+def connect_timeout_args(connect_timeout: str = "") -> List[str]:
+    """Return the workload arguments setting how long it retries to connect to the database.
+
+    katib-db-manager retries to connect to the database at startup until its --connect-timeout
+    expires, then exits. An empty value keeps the workload default.
+
+    Raises:
+        ValueError: if the value is not a Go duration.
+    """
+    if not connect_timeout:
+        return []
+    if not GO_DURATION_PATTERN.match(connect_timeout):
+        raise ValueError(
+            f"Invalid db-connect-timeout '{connect_timeout}', expected a Go duration such as '2m'"
+        )
+    return [f"--connect-timeout={connect_timeout}"]
@@ -0,0 +1,69 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Parsing and failover ordering of the MySQL endpoints advertised by the relational-db relation."""
+
+import logging
+import socket
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Timeout of the TCP probe of each endpoint, in seconds
+PROBE_TIMEOUT = 2
+
+Endpoint = Tuple[str, str]
+
+
+def parse_endpoints(endpoints: str) -> List[Endpoint]:
+    """Parse a comma-separated list of host:port endpoints, e.g. "10.0.0.1:3306,[::1]:3306".
+
+    Raises:
+        ValueError: if an endpoint has no port or a non-numeric port.
+    """
+    parsed = []
+    for endpoint in filter(None, (e.strip() for e in endpoints.split(","))):
+        host, separator, port = endpoint.rpartition(":")
+        if not separator or not host or not port.isdigit():
+            raise ValueError(f"Invalid endpoint '{endpoint}', expected host:port")
+        parsed.append((host.strip("[]"), port))
+    return parsed
+
+
+def format_endpoints(endpoints: List[Endpoint]) -> str:
+    """Return endpoints as a comma-separated list of host:port, bracketing IPv6 addresses."""
+    return ",".join(
+        f"[{host}]:{port}" if ":" in host else f"{host}:{port}" for host, port in endpoints
+    )
+
+
+def is_reachable(endpoint: Endpoint) -> bool:
+    """Return True if a TCP connection to the endpoint can be opened."""
+    try:
+        with socket.create_connection((endpoint[0], int(endpoint[1])), timeout=PROBE_TIMEOUT):
+            return True
+    except OSError:
+        return False
+
+
+def order_by_availability(
+    endpoints: List[Endpoint], preferred: Optional[Endpoint] = None
+) -> List[Endpoint]:
+    """Return the endpoints with the first reachable one first, keeping the relation order.
+
+    A single endpoint is returned as is, without probing it. If no endpoint is reachable, the
+    relation order is kept so that the workload retries the first endpoint.
+
+    Args:
+        endpoints: endpoints in the relation order.
+        preferred: endpoint in use by the workload, kept first while it is advertised and
+                   reachable so that a change of the other endpoints does not restart it.
+    """
+    if len(endpoints) <= 1:
+        return list(endpoints)
+    if preferred in endpoints and is_reachable(preferred):
+        return [preferred] + [endpoint for endpoint in endpoints if endpoint != preferred]
+    for index, endpoint in enumerate(endpoints):
+        if is_reachable(endpoint):
+            return [endpoint] + endpoints[:index] + endpoints[index + 1 :]  # noqa: E203
+        logger.warning(f"MySQL endpoint {format_endpoints([endpoint])} is not reachable")
+    return list(endpoints)
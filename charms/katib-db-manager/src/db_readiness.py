@@ -0,0 +1,74 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Readiness of the Katib database and of the katib-db-manager workload around its restarts."""
+
+import logging
+import time
+from typing import Dict
+
+import pymysql
+
+from db_endpoints import Endpoint, is_reachable
+from observation_logs import connect
+
+logger = logging.getLogger(__name__)
+
+# Delays between connection attempts, doubled after each failure up to the maximum, in seconds
+INITIAL_RETRY_DELAY = 1
+MAX_RETRY_DELAY = 10
+
+
+def check_database(db_data: Dict) -> None:
+    """Connect to the Katib database with the relation credentials and run a query.
+
+    Connecting to the database, rather than to the server, fails until the database exists and
+    the user has been granted access to it, which is what katib-db-manager needs to start.
+
+    Raises:
+        pymysql.MySQLError: if the database is not ready.
+    """
+    connection = connect(db_data)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    finally:
+        connection.close()
+
+
+def wait_for_database(db_data: Dict, timeout: float) -> None:
+    """Wait until the Katib database is ready, retrying with exponential backoff.
+
+    Args:
+        db_data: relational-db data of the database.
+        timeout: maximum time to wait, in seconds.
+
+    Raises:
+        pymysql.MySQLError: the error of the last attempt, if the database is not ready in time.
+    """
+    deadline = time.monotonic() + timeout
+    delay = INITIAL_RETRY_DELAY
+    while True:
+        try:
+            check_database(db_data)
+            return
+        except pymysql.MySQLError as err:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise
+            logger.info(f"Katib database not ready, retrying in {delay}s: {err}")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+
+def wait_until_reachable(endpoint: Endpoint, timeout: float) -> bool:
+    """Wait until a TCP connection to the endpoint can be opened, retrying every second.
+
+    Returns:
+        True if the endpoint became reachable within the timeout.
+    """
+    deadline = time.monotonic() + timeout
+    while not is_reachable(endpoint):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(INITIAL_RETRY_DELAY)
+    return True
@@ -0,0 +1,92 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Inspection and migration of the indexes of the Katib database."""
+
+import logging
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Indexes matching the GetObservationLog lookups: by trial, then by metric, then by time range
+RECOMMENDED_INDEXES = {
+    "observation_logs": {
+        "idx_observation_logs_trial_metric_time": ("trial_name", "metric_name", "time"),
+    },
+}
+
+
+def get_table_sizes(connection, database: str) -> Dict[str, Dict[str, int]]:
+    """Return the estimated rows, data and index bytes of the tables of the database."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH"
+            " FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME",
+            (database,),
+        )
+        return {
+            table: {"rows": rows or 0, "data-bytes": data or 0, "index-bytes": index or 0}
+            for table, rows, data, index in cursor.fetchall()
+        }
+
+
+def get_indexes(connection, database: str, table: str) -> Dict[str, Tuple[str, ...]]:
+    """Return the columns of each index of a table, in index order."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS"
+            " WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+            (database, table),
+        )
+        indexes = {}
+        for index_name, column_name in cursor.fetchall():
+            indexes[index_name] = indexes.get(index_name, ()) + (column_name,)
+        return indexes
+
+
+def get_index_coverage(indexes: Dict[str, Tuple[str, ...]], columns: Tuple[str, ...]) -> str:
+    """Return how well the indexes of a table serve lookups on the given columns.
+
+    Returns:
+        "full" if an index starts with all the columns, "partial" if an index starts with the
+        first column only, and "missing" otherwise.
+    """
+    prefixes = [index_columns[: len(columns)] for index_columns in indexes.values()]
+    if columns in prefixes:
+        return "full"
+    if any(prefix[:1] == columns[:1] for prefix in prefixes):
+        return "partial"
+    return "missing"
+
+
+def verify_indexes(connection, database: str, apply: bool = False) -> Dict[str, Dict[str, str]]:
+    """Report the coverage of the recommended indexes, creating or rebuilding them on apply.
+
+    Indexes are added with ALGORITHM=INPLACE, LOCK=NONE so that the table stays readable and
+    writable while the index is built; MySQL fails the statement instead of falling back to a
+    locking table copy if that is not possible. An existing index with the recommended name but
+    other columns is dropped and re-added in the same statement.
+
+    Returns:
+        For each table, the coverage of each recommended index, or "created" when it was built.
+    """
+    report = {}
+    for table, recommended in RECOMMENDED_INDEXES.items():
+        indexes = get_indexes(connection, database, table)
+        report[table] = {}
+        for index_name, columns in recommended.items():
+            coverage = get_index_coverage(indexes, columns)
+            report[table][index_name] = coverage
+            if coverage == "full" or not apply:
+                continue
+
+            clauses: List[str] = []
+            if index_name in indexes:
+                clauses.append(f"DROP INDEX {index_name}")
+            clauses.append(f"ADD INDEX {index_name} ({', '.join(columns)})")
+            logger.info(f"Creating index {index_name} on {table}({', '.join(columns)})")
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"ALTER TABLE {table} {', '.join(clauses)}, ALGORITHM=INPLACE, LOCK=NONE"
+                )
+            report[table][index_name] = "created"
+    return report
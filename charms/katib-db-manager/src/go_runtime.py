@@ -0,0 +1,102 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Go runtime tuning derived from the cgroup limits of a workload container."""
+
+import logging
+from typing import Dict, Optional
+
+from ops.model import Container
+from ops.pebble import Error as PebbleError
+
+logger = logging.getLogger(__name__)
+
+# cgroup v2 interface files, as seen from inside the workload container
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V2_MEMORY_MAX = "/sys/fs/cgroup/memory.max"
+# cgroup v1 interface files, used when the node still runs the legacy hierarchy
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+CGROUP_V1_MEMORY_LIMIT = "/sys/fs/cgroup/memory/memory.limit_in_bytes"
+# cgroup v1 reports an unlimited memory cgroup as a huge page-aligned value instead of "max"
+CGROUP_V1_MEMORY_UNLIMITED = 1 << 62
+# Fraction of the memory limit handed to the Go GC as a soft limit, leaving headroom for
+# non-heap memory (goroutine stacks, cgo, page cache charged to the cgroup)
+GOMEMLIMIT_RATIO = 0.9
+
+
+def _read_container_file(container: Container, path: str) -> Optional[str]:
+    """Return the stripped content of a file in the container, or None if it cannot be read."""
+    try:
+        return container.pull(path).read().strip()
+    except PebbleError:
+        return None
+
+
+def get_cpu_limit(container: Container) -> Optional[float]:
+    """Return the CPU quota of the container in cores, or None if it is not limited."""
+    cpu_max = _read_container_file(container, CGROUP_V2_CPU_MAX)
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+    else:
+        quota = _read_container_file(container, CGROUP_V1_CPU_QUOTA)
+        period = _read_container_file(container, CGROUP_V1_CPU_PERIOD)
+    try:
+        if quota is None or quota in ("max", "-1"):
+            return None
+        return int(quota) / int(period)
+    except (TypeError, ValueError, ZeroDivisionError):
+        logger.warning(f"Cannot parse cgroup CPU quota '{quota}' with period '{period}'")
+        return None
+
+
+def get_memory_limit(container: Container) -> Optional[int]:
+    """Return the memory limit of the container in bytes, or None if it is not limited."""
+    memory_max = _read_container_file(container, CGROUP_V2_MEMORY_MAX)
+    if memory_max is None:
+        memory_max = _read_container_file(container, CGROUP_V1_MEMORY_LIMIT)
+    if memory_max is None or memory_max == "max":
+        return None
+    try:
+        limit = int(memory_max)
+    except ValueError:
+        logger.warning(f"Cannot parse cgroup memory limit '{memory_max}'")
+        return None
+    if limit >= CGROUP_V1_MEMORY_UNLIMITED:
+        return None
+    return limit
+
+
+def go_runtime_environment(
+    container: Container, gomaxprocs: int = 0, gomemlimit: str = ""
+) -> Dict[str, str]:
+    """Return GOMAXPROCS and GOMEMLIMIT environment variables for a Go workload.
+
+    Values are derived from the cgroup limits of the container, so that the Go scheduler does not
+    run more threads than the CPU quota allows and the garbage collector works towards the memory
+    limit instead of only towards GOGC.  Variables for which no limit is found are left unset so
+    the Go defaults apply.
+
+    Args:
+        container: the workload container to read the cgroup limits from.
+        gomaxprocs: explicit GOMAXPROCS value; 0 derives it from the CPU quota.
+        gomemlimit: explicit GOMEMLIMIT value (e.g. "900MiB" or "off"); an empty string derives
+                    it from the memory limit.
+    """
+    environment = {}
+
+    if gomaxprocs > 0:
+        environment["GOMAXPROCS"] = str(gomaxprocs)
+    else:
+        cpu_limit = get_cpu_limit(container)
+        if cpu_limit is not None:
+            # Round down like uber-go/automaxprocs, as the quota is a hard ceiling
+            environment["GOMAXPROCS"] = str(max(1, int(cpu_limit)))
+
+    if gomemlimit:
+        environment["GOMEMLIMIT"] = gomemlimit
+    else:
+        memory_limit = get_memory_limit(container)
+        if memory_limit is not None:
+            environment["GOMEMLIMIT"] = str(int(memory_limit * GOMEMLIMIT_RATIO))
+
+    return environment
@@ -0,0 +1,85 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Streaming export of observation logs from the Katib database to a compressed CSV file."""
+
+import csv
+import gzip
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pymysql
+from lightkube import Client
+
+from observation_logs import IN_CLAUSE_CHUNK_SIZE, OBSERVATION_LOGS_TABLE, Trial, chunks
+
+logger = logging.getLogger(__name__)
+
+EXPORTS_DIR = Path("/tmp/exports")
+CSV_HEADER = ("experiment", "trial_name", "metric_name", "time", "value")
+# Label set by the Katib controller on the Trials of an Experiment
+TRIAL_EXPERIMENT_LABEL = "katib.kubeflow.org/experiment"
+
+
+def get_trial_experiments(
+    client: Client, namespace: str, experiment: Optional[str] = None
+) -> Dict[str, str]:
+    """Return the Experiment of each Trial of a namespace, or of one of its Experiments."""
+    labels = {TRIAL_EXPERIMENT_LABEL: experiment} if experiment else None
+    return {
+        trial.metadata.name: (trial.metadata.labels or {}).get(TRIAL_EXPERIMENT_LABEL, "")
+        for trial in client.list(Trial, namespace=namespace, labels=labels)
+    }
+
+
+def export_observation_logs(
+    connection,
+    trial_experiments: Dict[str, str],
+    name: str,
+    exports_dir: Optional[Path] = None,
+) -> Tuple[Path, int]:
+    """Write the observation logs of the given trials to a gzip-compressed CSV file.
+
+    Rows are streamed with a server-side cursor and written as they arrive, so the memory used
+    does not depend on the number of rows exported.
+
+    Args:
+        connection: connection to the Katib database.
+        trial_experiments: the Experiment of each trial to export, by trial name.
+        name: prefix of the export file.
+        exports_dir: directory the file is written to, EXPORTS_DIR by default.
+
+    Returns:
+        The path of the file and the number of rows written.
+    """
+    exports_dir = exports_dir or EXPORTS_DIR
+    exports_dir.mkdir(parents=True, exist_ok=True)
+    destination = exports_dir / f"{name}-{time.strftime('%Y%m%d%H%M%S')}.csv.gz"
+
+    rows = 0
+    with gzip.open(destination, "wt", newline="") as export_file:
+        writer = csv.writer(export_file)
+        writer.writerow(CSV_HEADER)
+        for trial_names in chunks(sorted(trial_experiments), IN_CLAUSE_CHUNK_SIZE):
+            placeholders = ", ".join(["%s"] * len(trial_names))
+            with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(
+                    f"SELECT trial_name, metric_name, time, value FROM {OBSERVATION_LOGS_TABLE}"
+                    f" WHERE trial_name IN ({placeholders}) ORDER BY trial_name, time, id",
+                    trial_names,
+                )
+                for trial_name, metric_name, logged_at, value in cursor:
+                    writer.writerow(
+                        (
+                            trial_experiments[trial_name],
+                            trial_name,
+                            metric_name,
+                            logged_at.isoformat() if logged_at else "",
+                            value,
+                        )
+                    )
+                    rows += 1
+
+    logger.info(f"Exported {rows} observation logs to {destination}")
+    return destination, rows
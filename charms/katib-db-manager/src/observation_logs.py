@@ -0,0 +1,366 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Maintenance of the observation_logs table of the Katib database."""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import pymysql
+from lightkube import Client
+from lightkube.generic_resource import create_namespaced_resource
+
+logger = logging.getLogger(__name__)
+
+Trial = create_namespaced_resource("kubeflow.org", "v1beta1", "Trial", "trials")
+
+# Table created by katib-db-manager, holding one row per reported metric point
+OBSERVATION_LOGS_TABLE = "observation_logs"
+# Bookkeeping table of the trials whose observation logs were downsampled
+COMPACTED_TABLE = "observation_logs_compacted"
+# Number of trial names or ids passed in a single IN (...) clause
+IN_CLAUSE_CHUNK_SIZE = 500
+CONNECT_TIMEOUT = 10
+
+
+def connect(db_data: Dict, read_only: bool = False) -> pymysql.connections.Connection:
+    """Return an autocommit connection to the Katib database from the relational-db data.
+
+    With read_only, the connection goes to the first read-only endpoint if the relation
+    advertises one, to keep read-heavy queries off the primary.
+    """
+    host, port = db_data["katib_db_host"], db_data["katib_db_port"]
+    if read_only and db_data.get("katib_db_read_only_endpoints"):
+        host, port = db_data["katib_db_read_only_endpoints"][0]
+    return pymysql.connect(
+        host=host,
+        port=int(port),
+        user=db_data["db_username"],
+        password=db_data["db_password"],
+        database=db_data["katib_db_name"],
+        connect_timeout=CONNECT_TIMEOUT,
+        autocommit=True,
+    )
+
+
+def chunks(items: List, size: int) -> Iterable[List]:
+    """Yield successive slices of items of at most size elements."""
+    for index in range(0, len(items), size):
+        yield items[index : index + size]  # noqa: E203
+
+
+def get_trial_names(client: Client) -> Set[str]:
+    """Return the names of the Trials that exist in the cluster, in any namespace."""
+    return {trial.metadata.name for trial in client.list(Trial, namespace="*")}
+
+
+def is_trial_name_indexed(connection) -> bool:
+    """Return True if an index of observation_logs starts with trial_name.
+
+    Without one, SELECT DISTINCT trial_name reads the whole table instead of the index.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS"
+            " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+            " AND COLUMN_NAME = 'trial_name' AND SEQ_IN_INDEX = 1",
+            (OBSERVATION_LOGS_TABLE,),
+        )
+        return bool(cursor.fetchone()[0])
+
+
+def get_orphaned_trial_names(connection, list_trial_names: Callable[[], Set[str]]) -> List[str]:
+    """Return the trial names with observation logs but no matching Trial object.
+
+    The logged trial names are read before the Trials are listed, so that a Trial created in
+    between, which may already log metrics, is never taken for a deleted one.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT trial_name FROM {OBSERVATION_LOGS_TABLE}")
+        logged_trial_names = {row[0] for row in cursor.fetchall()}
+    return sorted(logged_trial_names - list_trial_names())
+
+
+def _past(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def _delete_ids_in_batches(
+    connection,
+    select_ids_query: str,
+    params: tuple,
+    batch_size: int,
+    max_batches: int,
+    deadline: Optional[float] = None,
+) -> int:
+    """Delete the rows returned by select_ids_query, batch_size rows at a time.
+
+    Each batch selects primary keys first and deletes them in its own transaction, so that a
+    batch only locks the rows it deletes and replication applies small transactions. No batch
+    is started past the deadline, a time.monotonic() value.
+    """
+    deleted = 0
+    with connection.cursor() as cursor:
+        for _ in range(max_batches):
+            if _past(deadline):
+                break
+            cursor.execute(f"{select_ids_query} ORDER BY id LIMIT %s", (*params, batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            placeholders = ", ".join(["%s"] * len(ids))
+            deleted += cursor.execute(
+                f"DELETE FROM {OBSERVATION_LOGS_TABLE} WHERE id IN ({placeholders})", ids
+            )
+            if len(ids) < batch_size:
+                break
+    return deleted
+
+
+def prune_observation_logs(
+    connection,
+    list_trial_names: Optional[Callable[[], Set[str]]],
+    retention: Optional[timedelta],
+    batch_size: int,
+    max_batches: int,
+    dry_run: bool = False,
+    now: Optional[datetime] = None,
+    deadline: Optional[float] = None,
+) -> Dict[str, int]:
+    """Delete the observation logs of deleted Trials and the ones older than the retention.
+
+    Args:
+        connection: connection to the Katib database.
+        list_trial_names: returns the names of the existing Trials; None to keep orphaned logs.
+        retention: observation logs older than this are deleted; None to disable.
+        batch_size: number of rows deleted per transaction.
+        max_batches: maximum number of transactions per kind of deletion, to bound the run time.
+        dry_run: only count the rows that would be deleted.
+        now: current time, defaults to the current UTC time.
+        deadline: time.monotonic() value after which no batch is started; None for no limit.
+            With a deadline, orphaned logs are only looked up if trial_name is indexed, as
+            reading the logged trial names would otherwise scan the whole table.
+
+    Returns:
+        The number of "orphaned" and "expired" rows deleted, or that would be deleted.
+    """
+    pruned = {"orphaned": 0, "expired": 0}
+
+    if list_trial_names is not None and deadline is not None:
+        if _past(deadline):
+            list_trial_names = None
+        elif not is_trial_name_indexed(connection):
+            logger.warning(
+                "Skipping the orphaned observation logs, observation_logs has no index on"
+                " trial_name: run the verify-indexes action with apply=true to create it"
+            )
+            list_trial_names = None
+
+    if list_trial_names is not None:
+        orphaned = get_orphaned_trial_names(connection, list_trial_names)
+        for trial_names in chunks(orphaned, IN_CLAUSE_CHUNK_SIZE):
+            placeholders = ", ".join(["%s"] * len(trial_names))
+            condition = f"trial_name IN ({placeholders})"
+            if dry_run:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT COUNT(*) FROM {OBSERVATION_LOGS_TABLE} WHERE {condition}",
+                        trial_names,
+                    )
+                    pruned["orphaned"] += cursor.fetchone()[0]
+            else:
+                pruned["orphaned"] += _delete_ids_in_batches(
+                    connection,
+                    f"SELECT id FROM {OBSERVATION_LOGS_TABLE} WHERE {condition}",
+                    tuple(trial_names),
+                    batch_size,
+                    max_batches,
+                    deadline,
+                )
+
+    if retention is not None:
+        cutoff = (now or datetime.now(timezone.utc)) - retention
+        cutoff = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+        if dry_run:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {OBSERVATION_LOGS_TABLE} WHERE time < %s", (cutoff,)
+                )
+                pruned["expired"] = cursor.fetchone()[0]
+        else:
+            pruned["expired"] = _delete_ids_in_batches(
+                connection,
+                f"SELECT id FROM {OBSERVATION_LOGS_TABLE} WHERE time < %s",
+                (cutoff,),
+                batch_size,
+                max_batches,
+                deadline,
+            )
+
+    if not dry_run and any(pruned.values()):
+        logger.info(
+            f"Pruned {pruned['orphaned']} orphaned and {pruned['expired']} expired observation"
+            " logs"
+        )
+    return pruned
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+
+
+def get_completed_trial_names(
+    client: Client, older_than: timedelta, now: Optional[datetime] = None
+) -> List[str]:
+    """Return the names of the Trials that completed more than older_than ago."""
+    cutoff = (now or datetime.now(timezone.utc)) - older_than
+    names = []
+    for trial in client.list(Trial, namespace="*"):
+        completed_at = _parse_time((trial.status or {}).get("completionTime"))
+        if completed_at is not None and completed_at < cutoff:
+            names.append(trial.metadata.name)
+    return sorted(names)
+
+
+def select_points_to_delete(points: Sequence[Tuple[int, str]], keep_every: int) -> List[int]:
+    """Return the ids of the points of a metric curve that downsampling removes.
+
+    Args:
+        points: (id, value) of the points of one metric of one trial, ordered by time.
+        keep_every: every keep_every-th point is kept.
+
+    The first and last points, and the points with the minimum and maximum value, are always
+    kept, so that the shape of the curve and the best value of the objective are preserved.
+    """
+    if len(points) <= 2:
+        return []
+
+    kept = {0, len(points) - 1}
+    numeric = []
+    for index, (_, value) in enumerate(points):
+        try:
+            numeric.append((float(value), index))
+        except ValueError:
+            continue
+    if numeric:
+        kept.add(min(numeric)[1])
+        kept.add(max(numeric)[1])
+
+    return [
+        point_id
+        for index, (point_id, _) in enumerate(points)
+        if index not in kept and index % keep_every != 0
+    ]
+
+
+def _get_compacted_trial_names(connection, trial_names: List[str]) -> Set[str]:
+    compacted = set()
+    with connection.cursor() as cursor:
+        for chunk in chunks(trial_names, IN_CLAUSE_CHUNK_SIZE):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"SELECT trial_name FROM {COMPACTED_TABLE} WHERE trial_name IN ({placeholders})",
+                chunk,
+            )
+            compacted.update(row[0] for row in cursor.fetchall())
+    return compacted
+
+
+def _get_points_to_delete(cursor, trial_name: str, keep_every: int) -> List[int]:
+    cursor.execute(
+        f"SELECT id, metric_name, value FROM {OBSERVATION_LOGS_TABLE}"
+        " WHERE trial_name = %s ORDER BY metric_name, time, id",
+        (trial_name,),
+    )
+    curves = {}
+    for point_id, metric_name, value in cursor.fetchall():
+        curves.setdefault(metric_name, []).append((point_id, value))
+    return [
+        point_id
+        for points in curves.values()
+        for point_id in select_points_to_delete(points, keep_every)
+    ]
+
+
+def compact_observation_logs(
+    connection,
+    trial_names: List[str],
+    keep_every: int,
+    max_trials: int,
+    dry_run: bool = False,
+    deadline: Optional[float] = None,
+) -> Dict[str, int]:
+    """Downsample the observation logs of completed trials.
+
+    Each trial is compacted in a single transaction that also records it in the
+    observation_logs_compacted table, so that an interrupted run resumes with the trials that
+    were not compacted yet and a trial is never downsampled twice.
+
+    Args:
+        connection: connection to the Katib database.
+        trial_names: names of the completed trials to compact.
+        keep_every: every keep_every-th point of each metric curve is kept.
+        max_trials: maximum number of trials compacted in this run.
+        dry_run: only count the rows that would be deleted.
+        deadline: time.monotonic() value after which no trial is started; None for no limit.
+
+    Returns:
+        The number of "trials" compacted and of "rows-removed", or that would be on a dry run.
+
+    Raises:
+        ValueError: if keep_every is not positive.
+    """
+    if keep_every < 1:
+        raise ValueError("observation-log-compaction-keep-every must be positive")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {COMPACTED_TABLE} ("
+            " trial_name VARCHAR(255) NOT NULL PRIMARY KEY,"
+            " compacted_at DATETIME NOT NULL,"
+            " rows_removed INT NOT NULL)"
+        )
+    compacted = _get_compacted_trial_names(connection, trial_names)
+    pending = [name for name in trial_names if name not in compacted][:max_trials]
+
+    result = {"trials": 0, "rows-removed": 0}
+    for trial_name in pending:
+        if _past(deadline):
+            break
+        if dry_run:
+            with connection.cursor() as cursor:
+                result["rows-removed"] += len(
+                    _get_points_to_delete(cursor, trial_name, keep_every)
+                )
+            result["trials"] += 1
+            continue
+
+        connection.begin()
+        try:
+            with connection.cursor() as cursor:
+                to_delete = _get_points_to_delete(cursor, trial_name, keep_every)
+                for ids in chunks(to_delete, IN_CLAUSE_CHUNK_SIZE):
+                    placeholders = ", ".join(["%s"] * len(ids))
+                    cursor.execute(
+                        f"DELETE FROM {OBSERVATION_LOGS_TABLE} WHERE id IN ({placeholders})", ids
+                    )
+                cursor.execute(
+                    f"INSERT INTO {COMPACTED_TABLE} (trial_name, compacted_at, rows_removed)"
+                    " VALUES (%s, UTC_TIMESTAMP(), %s)",
+                    (trial_name, len(to_delete)),
+                )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        result["trials"] += 1
+        result["rows-removed"] += len(to_delete)
+
+    if not dry_run and result["trials"]:
+        logger.info(
+            f"Compacted the observation logs of {result['trials']} trials, removing"
+            f" {result['rows-removed']} rows"
+        )
+    return result
@@ -0,0 +1,297 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Range partitioning by time of the observation_logs table of the Katib database."""
+
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from observation_logs import OBSERVATION_LOGS_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Partitioned copy of observation_logs filled during the migration, then swapped in
+SHADOW_TABLE = "observation_logs_partitioned"
+# Name of the original table between the swap and the end of the migration
+UNPARTITIONED_TABLE = "observation_logs_unpartitioned"
+# Bookkeeping of the ids copied before the swap and reconciled after it
+MIGRATION_TABLE = "observation_logs_migration"
+# Catch-all partition of the rows newer than the last time partition
+MAX_PARTITION = "pmax"
+# Number of future partitions kept ahead of the current time
+PARTITIONS_AHEAD = 2
+COPY_BATCH_SIZE = 10000
+# Gap left in the ids after the copied rows, for the rows written during the swap
+SWAP_ID_MARGIN = 100000
+# TO_DAYS() of a date is its proleptic Gregorian ordinal plus 365
+TO_DAYS_OFFSET = 365
+COLUMNS = "trial_name, id, time, metric_name, value"
+
+
+def _to_days(day: date) -> int:
+    return day.toordinal() + TO_DAYS_OFFSET
+
+
+def _from_days(days: int) -> date:
+    return date.fromordinal(days - TO_DAYS_OFFSET)
+
+
+def partition_boundaries(start: date, end: date, partition_days: int) -> List[date]:
+    """Return the upper bounds of the partitions covering start to end, aligned on the interval.
+
+    Boundaries are aligned on multiples of partition_days since the year 1, so that they do not
+    depend on when the migration or the rotation ran.
+    """
+    first = _to_days(start) // partition_days * partition_days + partition_days
+    return [
+        _from_days(days) for days in range(first, _to_days(end) + partition_days, partition_days)
+    ]
+
+
+def _partition_definition(boundary: date) -> str:
+    return f"PARTITION p{boundary:%Y%m%d} VALUES LESS THAN ({_to_days(boundary)})"
+
+
+def _scalar(connection, query: str, params: tuple = ()):
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchone()[0]
+
+
+def get_partitions(connection, table: str = OBSERVATION_LOGS_TABLE) -> List[Tuple[str, str]]:
+    """Return the (name, description) of the partitions of a table, empty if not partitioned."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS"
+            " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+            " AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION",
+            (table,),
+        )
+        return list(cursor.fetchall())
+
+
+def _table_exists(connection, table: str) -> bool:
+    return bool(
+        _scalar(
+            connection,
+            "SELECT COUNT(*) FROM information_schema.TABLES"
+            " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,),
+        )
+    )
+
+
+def is_migrated(connection) -> bool:
+    """Return True if observation_logs is partitioned and the migration is complete."""
+    return bool(get_partitions(connection)) and not _table_exists(connection, UNPARTITIONED_TABLE)
+
+
+def _create_shadow_table(connection, partition_days: int, now: datetime) -> None:
+    # Ids are increasing, so the row with the lowest id is one of the oldest, and is read from
+    # the primary key instead of scanning time. Older rows go to the first partition.
+    first_time = _scalar(
+        connection, f"SELECT (SELECT time FROM {OBSERVATION_LOGS_TABLE} ORDER BY id LIMIT 1)"
+    )
+    start = (first_time or now).date()
+    boundaries = partition_boundaries(
+        start, now.date() + timedelta(days=PARTITIONS_AHEAD * partition_days), partition_days
+    )
+    partitions = [_partition_definition(boundary) for boundary in boundaries]
+    partitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+    # Same columns as the table created by katib-db-manager. The partitioning column must be
+    # part of the primary key, and time becomes NOT NULL to be part of it.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {SHADOW_TABLE} ("
+            " trial_name VARCHAR(255) NOT NULL,"
+            " id INT NOT NULL AUTO_INCREMENT,"
+            " time DATETIME(6) NOT NULL,"
+            " metric_name VARCHAR(255) NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (id, time),"
+            " KEY idx_observation_logs_trial_metric_time (trial_name, metric_name, time))"
+            f" PARTITION BY RANGE (TO_DAYS(time)) ({', '.join(partitions)})"
+        )
+
+
+def _copy_rows(
+    connection, source: str, target: str, after_id: int, limit: Optional[int] = None
+) -> int:
+    query = (
+        f"INSERT INTO {target} ({COLUMNS})"
+        " SELECT trial_name, id, COALESCE(time, '1970-01-01'), metric_name, value"
+        f" FROM {source} WHERE id > %s ORDER BY id"
+    )
+    params = (after_id,)
+    if limit is not None:
+        query += " LIMIT %s"
+        params += (limit,)
+    with connection.cursor() as cursor:
+        return cursor.execute(query, params)
+
+
+def _swap_tables(connection, copied_id: int) -> None:
+    """Swap the shadow table in, then copy the rows written to the original table meanwhile."""
+    max_id = _scalar(connection, f"SELECT COALESCE(MAX(id), 0) FROM {OBSERVATION_LOGS_TABLE}")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {MIGRATION_TABLE} ("
+            " copied_id BIGINT NOT NULL, reconciled_id BIGINT NOT NULL)"
+        )
+        cursor.execute(f"DELETE FROM {MIGRATION_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {MIGRATION_TABLE} (copied_id, reconciled_id) VALUES (%s, 0)",
+            (copied_id,),
+        )
+        # Leave room for the rows written between this statement and the rename
+        cursor.execute(
+            f"ALTER TABLE {SHADOW_TABLE} AUTO_INCREMENT = %s", (max_id + SWAP_ID_MARGIN,)
+        )
+        cursor.execute(
+            f"RENAME TABLE {OBSERVATION_LOGS_TABLE} TO {UNPARTITIONED_TABLE},"
+            f" {SHADOW_TABLE} TO {OBSERVATION_LOGS_TABLE}"
+        )
+    # Nothing writes to the original table after the rename, so its last rows are copied once
+    connection.begin()
+    try:
+        _copy_rows(connection, UNPARTITIONED_TABLE, OBSERVATION_LOGS_TABLE, copied_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {MIGRATION_TABLE} SET copied_id ="
+                f" (SELECT COALESCE(MAX(id), %s) FROM {UNPARTITIONED_TABLE})",
+                (copied_id,),
+            )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+
+def _reconcile_deletes(connection, deadline: float) -> Optional[Tuple[str, float]]:
+    """Delete the copied rows that were deleted from the original table during the copy.
+
+    Rows are deleted by katib-db-manager and by the pruning while they are copied in id order,
+    so the copy can hold rows that no longer exist in the original table. After the swap, the
+    original table is frozen and is compared to the copied id range batch by batch, recording
+    the progress so that it resumes on the next step.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT copied_id, reconciled_id FROM {MIGRATION_TABLE}")
+        copied_id, reconciled_id = cursor.fetchone()
+    while reconciled_id < copied_id:
+        if time.monotonic() >= deadline:
+            return "reconciled", reconciled_id / copied_id
+        upper = min(reconciled_id + COPY_BATCH_SIZE, copied_id)
+        connection.begin()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE migrated FROM {OBSERVATION_LOGS_TABLE} AS migrated"
+                    f" LEFT JOIN {UNPARTITIONED_TABLE} AS original ON original.id = migrated.id"
+                    " WHERE migrated.id > %s AND migrated.id <= %s AND original.id IS NULL",
+                    (reconciled_id, upper),
+                )
+                cursor.execute(f"UPDATE {MIGRATION_TABLE} SET reconciled_id = %s", (upper,))
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        reconciled_id = upper
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {UNPARTITIONED_TABLE}")
+        cursor.execute(f"DROP TABLE {MIGRATION_TABLE}")
+    logger.info("observation_logs is now partitioned by time")
+    return None
+
+
+def migrate_step(
+    connection, partition_days: int, time_budget: float, now: Optional[datetime] = None
+) -> Optional[Tuple[str, float]]:
+    """Copy observation_logs to a partitioned table for up to time_budget seconds.
+
+    The copy resumes from the highest id already in the shadow table, so each step continues
+    where the previous one stopped. Once a batch copies fewer rows than the batch size, the
+    tables are swapped with an atomic RENAME TABLE and the rows written since that batch are
+    copied. The rows deleted from the original table during the copy are then deleted from the
+    partitioned table.
+
+    Returns:
+        The phase, "copied" or "reconciled", and the fraction of the rows it processed while
+        the migration is in progress, None once done.
+    """
+    now = now or datetime.now(timezone.utc)
+    deadline = time.monotonic() + time_budget
+    if _table_exists(connection, UNPARTITIONED_TABLE):
+        return _reconcile_deletes(connection, deadline)
+    if not _table_exists(connection, SHADOW_TABLE):
+        _create_shadow_table(connection, partition_days, now)
+
+    while True:
+        copied_id = _scalar(connection, f"SELECT COALESCE(MAX(id), 0) FROM {SHADOW_TABLE}")
+        if time.monotonic() >= deadline:
+            # Ids are increasing, so the copied id range estimates the progress
+            max_id = _scalar(connection, f"SELECT MAX(id) FROM {OBSERVATION_LOGS_TABLE}")
+            return "copied", copied_id / max_id if max_id else 0.0
+        copied = _copy_rows(
+            connection, OBSERVATION_LOGS_TABLE, SHADOW_TABLE, copied_id, COPY_BATCH_SIZE
+        )
+        if copied < COPY_BATCH_SIZE:
+            copied_id = _scalar(connection, f"SELECT COALESCE(MAX(id), 0) FROM {SHADOW_TABLE}")
+            _swap_tables(connection, copied_id)
+            return _reconcile_deletes(connection, deadline)
+
+
+def rotate_partitions(
+    connection,
+    partition_days: int,
+    retention: Optional[timedelta],
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """Add the upcoming time partitions and drop the ones older than the retention.
+
+    New partitions are split from the catch-all partition, which holds no rows as long as
+    partitions are added ahead of time, so the split does not move data. Dropping a partition
+    removes its rows without the cost of deleting them one by one.
+
+    Returns:
+        The names of the partitions dropped.
+    """
+    now = now or datetime.now(timezone.utc)
+    boundaries = {
+        _from_days(int(description)): name
+        for name, description in get_partitions(connection)
+        if name != MAX_PARTITION
+    }
+    last_boundary = max(boundaries, default=now.date())
+
+    upcoming = [
+        boundary
+        for boundary in partition_boundaries(
+            last_boundary,
+            now.date() + timedelta(days=PARTITIONS_AHEAD * partition_days),
+            partition_days,
+        )
+        if boundary > last_boundary
+    ]
+    if upcoming:
+        definitions = [_partition_definition(boundary) for boundary in upcoming]
+        definitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {OBSERVATION_LOGS_TABLE} REORGANIZE PARTITION {MAX_PARTITION}"
+                f" INTO ({', '.join(definitions)})"
+            )
+
+    dropped = []
+    if retention is not None:
+        cutoff = (now - retention).date()
+        dropped = [name for boundary, name in sorted(boundaries.items()) if boundary <= cutoff]
+        if dropped:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"ALTER TABLE {OBSERVATION_LOGS_TABLE} DROP PARTITION {', '.join(dropped)}"
+                )
+            logger.info(f"Dropped expired observation_logs partitions {dropped}")
+    return dropped
@@ -4,7 +4,9 @@ output "app_name" {
 
 output "provides" {
   value = {
-    k8s_service_info = "k8s-service-info"
+    k8s_service_info  = "k8s-service-info"
+    grafana_dashboard = "grafana-dashboard"
+    metrics_endpoint  = "metrics-endpoint"
   }
 }
 
@@ -1,12 +1,36 @@
+import csv
+import gzip
+import json
+import time
+from datetime import date, datetime, timedelta, timezone
 from unittest.mock import MagicMock, patch
 
+import pymysql
 import pytest
 from charmed_kubeflow_chisme.exceptions import ErrorWithStatus
+from lightkube.models.core_v1 import Container, PodSpec
+from lightkube.models.meta_v1 import ObjectMeta
+from lightkube.resources.core_v1 import Pod
 from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus, WaitingStatus
 from ops.pebble import CheckStatus
 from ops.testing import Harness
 
 from charm import KatibDBManagerOperator
+from db_endpoints import order_by_availability, parse_endpoints
+from db_readiness import wait_for_database
+from db_schema import get_index_coverage
+from observation_logs import Trial, prune_observation_logs, select_points_to_delete
+from partitioning import migrate_step, partition_boundaries, rotate_partitions
+
+DB_DATA = {
+    "db_type": "mysql",
+    "db_username": "username",
+    "db_password": "password",
+    "katib_db_host": "host",
+    "katib_db_port": "1234",
+    "katib_db_read_only_endpoints": [],
+    "katib_db_name": "katib",
+}
 
 
 @pytest.fixture
@@ -33,6 +57,14 @@ def mocked_lightkube_client(mocker, mocked_resource_handler):
     yield mocked_resource_handler.lightkube_client
 
 
+@pytest.fixture(autouse=True)
+def mocked_compute_resources_patch(mocker):
+    """Mocks the KubernetesComputeResourcesPatch for the charm, which patches the StatefulSet."""
+    mocked_compute_resources_patch = mocker.patch("charm.KubernetesComputeResourcesPatch")
+    mocked_compute_resources_patch.return_value.get_status.return_value = ActiveStatus()
+    yield mocked_compute_resources_patch
+
+
 @pytest.fixture()
 def mocked_kubernetes_service_patcher(mocker):
     mocked_service_patcher = mocker.patch("charm.KubernetesServicePatch")
@@ -40,6 +72,28 @@ def mocked_kubernetes_service_patcher(mocker):
     yield mocked_service_patcher
 
 
+@pytest.fixture()
+def mocked_wait_for_database(mocker):
+    """Mocks the wait for the Katib database before the workload is replanned."""
+    yield mocker.patch("charm.wait_for_database")
+
+
+@pytest.fixture()
+def mocked_wait_until_reachable(mocker):
+    """Mocks the wait for the workload to accept connections after a replan."""
+    yield mocker.patch("charm.wait_until_reachable", return_value=True)
+
+
+@pytest.fixture()
+def mocked_db_cursor(mocker):
+    """Mocks the connection to the Katib database, yielding the cursor of the connection."""
+    mocker.patch("charm.KatibDBManagerOperator._get_db_data", return_value=DB_DATA)
+    mocked_connect = mocker.patch("charm.connect")
+    mocked_cursor = MagicMock()
+    mocked_connect.return_value.cursor.return_value.__enter__.return_value = mocked_cursor
+    yield mocked_cursor
+
+
 def test_log_forwarding(
     harness: Harness,
     mocked_resource_handler,
@@ -81,7 +135,12 @@ def test_no_relation(
 
 
 def test_pebble_layer(
-    harness, mocked_resource_handler, mocked_lightkube_client, mocked_kubernetes_service_patcher
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_wait_for_database,
+    mocked_wait_until_reachable,
 ):
     """
     Test creation of Pebble layer given that relational-db relation is complete.
@@ -108,8 +167,43 @@ def test_pebble_layer(
     pebble_plan_info = pebble_plan.to_dict()
     assert pebble_plan_info["services"]["katib-db-manager"]["command"] == "./katib-db-manager"
     test_env = pebble_plan_info["services"]["katib-db-manager"]["environment"]
-    # there should be size (6) environment variables
+    # there should be six (6) environment variables
     assert 6 == len(test_env)
+    check = pebble_plan_info["checks"]["katib-db-manager-up"]
+    assert check["tcp"] == {"port": 6789}
+    assert (check["period"], check["threshold"]) == ("10s", 3)
+    assert pebble_plan_info["services"]["katib-db-manager"]["on-check-failure"] == {
+        "katib-db-manager-up": "restart"
+    }
+    assert pebble_plan_info["services"]["katib-db-manager"]["kill-delay"] == "30s"
+
+
+def test_health_check_config_updates_plan(
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_wait_for_database,
+    mocked_wait_until_reachable,
+):
+    """Test that a change of the health check config alone reaches the Pebble plan."""
+    database = MagicMock()
+    database.fetch_relation_data.return_value = {
+        "test-db-data": {"endpoints": "host:1234", "username": "username", "password": "password"}
+    }
+    harness.model.get_relation = MagicMock(side_effect=_get_relation_db_only_side_effect_func)
+    harness.begin()
+    harness.charm.database = database
+    harness.container_pebble_ready("katib-db-manager")
+
+    harness.update_config(
+        {"health-check-period": "20s", "health-check-timeout": "5s", "health-check-threshold": 5}
+    )
+
+    check = harness.get_container_pebble_plan("katib-db-manager").to_dict()["checks"][
+        "katib-db-manager-up"
+    ]
+    assert (check["period"], check["timeout"], check["threshold"]) == ("20s", "5s", 5)
 
 
 def test_apply_k8s_resources_success(
@@ -122,10 +216,6 @@ def test_apply_k8s_resources_success(
     assert isinstance(harness.charm.model.unit.status, MaintenanceStatus)
 
 
-# FIXME: re-enable test when https://github.com/canonical/katib-operators/issues/128 is closed.
-@pytest.mark.skip(
-    "Skipping due to Pebble health checks being disabled. Re-enable when #128 is closed."
-)
 @patch("charm.KatibDBManagerOperator._get_check_status")
 @pytest.mark.parametrize(
     "health_check_status, charm_status",
@@ -142,6 +232,8 @@ def test_update_status(
     mocked_resource_handler,
     mocked_lightkube_client,
     mocked_kubernetes_service_patcher,
+    mocked_wait_for_database,
+    mocked_wait_until_reachable,
 ):
     """
     Test update status handler.
@@ -158,6 +250,9 @@ def test_update_status(
     }
     database.fetch_relation_data = fetch_relation_data
     harness.model.get_relation = MagicMock(side_effect=_get_relation_db_only_side_effect_func)
+    mocked_lightkube_client.get.return_value = Pod(
+        spec=PodSpec(containers=[Container(name="katib-db-manager", resources=None)])
+    )
     harness.set_leader(True)
     harness.begin_with_initial_hooks()
     harness.charm.database = database
@@ -259,3 +354,799 @@ def test_relational_db_relation_with_data(
             "katib_db_port": "1234",
             "katib_db_name": "database",
         }
+
+
+@pytest.mark.parametrize(
+    "cgroup_files,config,expected_environment",
+    [
+        (
+            {"/sys/fs/cgroup/cpu.max": "150000 100000", "/sys/fs/cgroup/memory.max": "2000"},
+            {},
+            {"GOMAXPROCS": "1", "GOMEMLIMIT": "1800"},
+        ),
+        ({}, {}, {}),
+        (
+            {"/sys/fs/cgroup/cpu.max": "150000 100000"},
+            {"gomaxprocs": 4, "gomemlimit": "512MiB"},
+            {"GOMAXPROCS": "4", "GOMEMLIMIT": "512MiB"},
+        ),
+    ],
+)
+def test_service_environment_go_runtime(
+    cgroup_files,
+    config,
+    expected_environment,
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+):
+    """Test that GOMAXPROCS and GOMEMLIMIT are derived from cgroup limits or config."""
+    harness.update_config(config)
+    harness.set_can_connect("katib-db-manager", True)
+    harness.begin()
+    for path, content in cgroup_files.items():
+        harness.charm.container.push(path, content, make_dirs=True)
+    harness.charm._db_data = DB_DATA
+
+    environment = harness.charm.service_environment
+
+    for variable in ["GOMAXPROCS", "GOMEMLIMIT"]:
+        assert environment.get(variable) == expected_environment.get(variable)
+
+
+@pytest.mark.parametrize(
+    "patch_status",
+    [ActiveStatus(), WaitingStatus("Waiting for resource limit patch to apply")],
+)
+def test_resources_patch(
+    patch_status,
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_wait_for_database,
+    mocked_wait_until_reachable,
+    mocked_compute_resources_patch,
+):
+    """Test that the resources patch gets the configured resources and sets the unit status."""
+    harness.update_config({"cpu-limit": "1000m", "memory-request": "128Mi"})
+    mocked_compute_resources_patch.return_value.get_status.return_value = patch_status
+    database = MagicMock()
+    database.fetch_relation_data.return_value = {
+        "test-db-data": {"endpoints": "host:1234", "username": "username", "password": "password"}
+    }
+    harness.model.get_relation = MagicMock(side_effect=_get_relation_db_only_side_effect_func)
+    harness.begin()
+    harness.charm.database = database
+
+    harness.container_pebble_ready("katib-db-manager")
+
+    resource_reqs_func = mocked_compute_resources_patch.call_args.kwargs["resource_reqs_func"]
+    resource_requirements = resource_reqs_func()
+    assert mocked_compute_resources_patch.call_args.args[1] == "katib-db-manager"
+    assert resource_requirements.limits["cpu"] == "1"
+    assert resource_requirements.requests["memory"] == "128Mi"
+    assert harness.charm.model.unit.status == patch_status
+
+
+def test_capture_profile_action(
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocker,
+    tmp_path,
+):
+    """Test that the action fetches the heap profile from localhost and returns its path."""
+    mocker.patch("profiling.PROFILES_DIR", tmp_path)
+    mocked_urlopen = mocker.patch("profiling.urlopen")
+    mocked_urlopen.return_value.__enter__.return_value.read.return_value = b"heap"
+    harness.update_config({"profiling-port": 6060})
+    harness.begin()
+
+    output = harness.run_action("capture-profile", {"profile": "heap", "duration": 60})
+
+    assert mocked_urlopen.call_args.args[0] == "http://localhost:6060/debug/pprof/heap?seconds=60"
+    assert output.results["path"].startswith(str(tmp_path))
+    assert output.results["size"] == 4
+
+
+def test_prune_observation_logs_in_batches():
+    """Test that orphaned and expired logs are deleted by primary key in bounded batches."""
+    # Arrange
+    connection = MagicMock()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchall.side_effect = [
+        # distinct trial names, then ids of orphaned rows
+        [("deleted-trial",), ("existing-trial",)],
+        [(1,), (2,)],
+        [(3,)],
+        # ids of expired rows, then no more rows
+        [(10,), (11,)],
+        [],
+    ]
+    cursor.execute.side_effect = lambda query, params=None: (
+        len(params) if query.startswith("DELETE") else None
+    )
+
+    def list_trial_names():
+        # Trials are listed after the logged trial names are read
+        assert cursor.fetchall.call_count == 1
+        return {"existing-trial"}
+
+    # Act
+    pruned = prune_observation_logs(
+        connection,
+        list_trial_names=list_trial_names,
+        retention=timedelta(days=30),
+        batch_size=2,
+        max_batches=10,
+    )
+
+    # Assert
+    assert pruned == {"orphaned": 3, "expired": 2}
+    delete_queries = [
+        c.args for c in cursor.execute.call_args_list if c.args[0].startswith("DELETE")
+    ]
+    assert delete_queries == [
+        ("DELETE FROM observation_logs WHERE id IN (%s, %s)", [1, 2]),
+        ("DELETE FROM observation_logs WHERE id IN (%s)", [3]),
+        ("DELETE FROM observation_logs WHERE id IN (%s, %s)", [10, 11]),
+    ]
+
+
+def test_prune_observation_logs_stops_at_deadline(mocker):
+    """Test that no delete batch is started once the time budget of the hook is spent."""
+    # Arrange
+    connection = MagicMock()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchall.side_effect = [[(1,), (2,)], [(3,)]]
+    cursor.execute.side_effect = lambda query, params=None: (
+        len(params) if query.startswith("DELETE") else None
+    )
+    mocker.patch("observation_logs.time.monotonic", side_effect=[0, 10])
+
+    # Act
+    pruned = prune_observation_logs(
+        connection,
+        list_trial_names=None,
+        retention=timedelta(days=30),
+        batch_size=2,
+        max_batches=10,
+        deadline=5,
+    )
+
+    # Assert
+    assert pruned == {"orphaned": 0, "expired": 2}
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+def test_prune_observation_logs_requires_trial_name_index(indexed):
+    """Test that logged trial names are only read on update-status if trial_name is indexed."""
+    # Arrange
+    connection = MagicMock()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = (int(indexed),)
+    cursor.fetchall.side_effect = [[("deleted-trial",)], [(1,)]]
+    cursor.execute.side_effect = lambda query, params=None: (
+        len(params) if query.startswith("DELETE") else None
+    )
+
+    # Act
+    pruned = prune_observation_logs(
+        connection,
+        list_trial_names=set,
+        retention=None,
+        batch_size=2,
+        max_batches=10,
+        deadline=time.monotonic() + 60,
+    )
+
+    # Assert
+    queries = [c.args[0] for c in cursor.execute.call_args_list]
+    assert pruned == {"orphaned": int(indexed), "expired": 0}
+    assert ("SELECT DISTINCT trial_name FROM observation_logs" in queries) == indexed
+
+
+def test_prune_observation_logs_action_dry_run(
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_db_cursor,
+):
+    """Test that the dry-run action counts the rows of trials without a Trial object."""
+    # Arrange
+    harness.update_config({"observation-log-prune-orphans": True})
+    trials = [Trial(metadata=ObjectMeta(name="existing-trial", namespace="ns"))]
+    mocked_lightkube_client.list.side_effect = lambda resource, **kwargs: (
+        trials if resource is Trial else []
+    )
+    mocked_db_cursor.fetchall.return_value = [("deleted-trial",), ("existing-trial",)]
+    mocked_db_cursor.fetchone.return_value = (42,)
+    harness.begin()
+
+    # Act
+    output = harness.run_action("prune-observation-logs", {"dry-run": True})
+
+    # Assert
+    assert output.results == {"orphaned": 42, "expired": 0}
+    assert mocked_db_cursor.execute.call_args.args == (
+        "SELECT COUNT(*) FROM observation_logs WHERE trial_name IN (%s)",
+        ["deleted-trial"],
+    )
+    assert not any(c.args[0].startswith("DELETE") for c in mocked_db_cursor.execute.call_args_list)
+
+
+@pytest.mark.parametrize(
+    "values,keep_every,expected_deleted_ids",
+    [
+        # First, last, min (id 3), max (id 5) and every 3rd point (ids 0, 3, 6) are kept
+        (["0.5", "0.4", "0.3", "0.1", "0.2", "0.9", "0.3", "0.3"], 3, [1, 2, 4]),
+        # keep_every 1 keeps every point
+        (["0.5", "0.4", "0.3"], 1, []),
+        # Non-numeric values only keep the first, last and k-th points
+        (["a", "b", "c", "d"], 2, [1]),
+    ],
+)
+def test_select_points_to_delete(values, keep_every, expected_deleted_ids):
+    """Test that downsampling keeps the first, last, best and every k-th point."""
+    points = list(enumerate(values))
+
+    assert select_points_to_delete(points, keep_every) == expected_deleted_ids
+
+
+def test_compact_observation_logs_action(
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_db_cursor,
+):
+    """Test that each old completed trial is downsampled and recorded in one transaction."""
+    # Arrange
+    harness.update_config({"observation-log-compaction-days": 7})
+    trials = [
+        Trial(
+            metadata=ObjectMeta(name=name, namespace="ns"),
+            status={"completionTime": completion_time},
+        )
+        for name, completion_time in [
+            ("old-trial", "2020-01-01T00:00:00Z"),
+            ("running-trial", None),
+        ]
+    ]
+    mocked_lightkube_client.list.side_effect = lambda resource, **kwargs: (
+        trials if resource is Trial else []
+    )
+    mocked_db_cursor.fetchall.side_effect = [
+        # no trial compacted yet, then the loss curve of old-trial
+        [],
+        [(i, "loss", str(1 / (i + 1))) for i in range(25)],
+    ]
+    harness.begin()
+
+    # Act
+    output = harness.run_action("compact-observation-logs", {"dry-run": False})
+
+    # Assert
+    # 25 points: keep the first, the last (also the minimum) and every 10th point
+    assert output.results == {"trials": 1, "rows-removed": 21}
+    queries = [c.args[0] for c in mocked_db_cursor.execute.call_args_list]
+    assert queries[-1].startswith("INSERT INTO observation_logs_compacted")
+    assert mocked_db_cursor.execute.call_args_list[-1].args[1] == ("old-trial", 21)
+
+
+@pytest.mark.parametrize(
+    "indexes,expected_coverage",
+    [
+        ({"PRIMARY": ("id",)}, "missing"),
+        ({"PRIMARY": ("id",), "idx_trial": ("trial_name",)}, "partial"),
+        ({"idx": ("trial_name", "metric_name", "time", "id")}, "full"),
+    ],
+)
+def test_get_index_coverage(indexes, expected_coverage):
+    """Test that an index is only full coverage if it starts with all the lookup columns."""
+    columns = ("trial_name", "metric_name", "time")
+
+    assert get_index_coverage(indexes, columns) == expected_coverage
+
+
+@pytest.mark.parametrize("apply", [True, False])
+def test_verify_indexes_action(
+    apply,
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_db_cursor,
+):
+    """Test that table sizes and coverage are reported and missing indexes created online."""
+    # Arrange
+    mocked_db_cursor.fetchall.side_effect = [
+        [("PRIMARY", "id"), ("idx_trial", "trial_name")],
+        [("observation_logs", 1000, 16384, 0)],
+    ]
+    harness.begin()
+
+    # Act
+    output = harness.run_action("verify-indexes", {"apply": apply})
+
+    # Assert
+    assert output.results == {
+        "tables": {
+            "observation-logs": {"rows": "1000", "data-bytes": "16384", "index-bytes": "0"}
+        },
+        "indexes": {
+            "observation-logs": {
+                "idx-observation-logs-trial-metric-time": "created" if apply else "partial"
+            }
+        },
+    }
+    alter_queries = [
+        c.args[0] for c in mocked_db_cursor.execute.call_args_list if "ALTER" in c.args[0]
+    ]
+    if apply:
+        assert alter_queries == [
+            "ALTER TABLE observation_logs ADD INDEX idx_observation_logs_trial_metric_time"
+            " (trial_name, metric_name, time), ALGORITHM=INPLACE, LOCK=NONE"
+        ]
+    else:
+        assert alter_queries == []
+
+
+def _to_days(day: date) -> int:
+    """Return the MySQL TO_DAYS() of a date."""
+    return day.toordinal() + 365
+
+
+def test_partition_boundaries():
+    """Test that partition boundaries are aligned on the partition interval and cover the range."""
+    boundaries = partition_boundaries(date(2026, 1, 1), date(2026, 1, 20), partition_days=7)
+
+    assert boundaries[0] > date(2026, 1, 1) and boundaries[-1] > date(2026, 1, 20)
+    assert all(_to_days(boundary) % 7 == 0 for boundary in boundaries)
+    assert [(b - a).days for a, b in zip(boundaries, boundaries[1:])] == [7] * (
+        len(boundaries) - 1
+    )
+
+
+@pytest.mark.parametrize(
+    "time_budget,fetchone_values,expected_progress",
+    [
+        # Last batch not full: swap the tables, copy the rows since and reconcile the deletes
+        (60, [0, 0, None, 0, 5, 5, (5, 0)], None),
+        # Out of time budget: report the copied fraction of the id range without copying
+        (0, [0, 1, 100, 400], ("copied", 0.25)),
+        # Swapped in a previous step, out of time budget: report the reconciled fraction
+        (0, [1, (40000, 10000)], ("reconciled", 0.25)),
+    ],
+)
+def test_migrate_step(time_budget, fetchone_values, expected_progress):
+    """Test that the migration copies to the partitioned table and swaps it in when done."""
+    # Arrange
+    connection = MagicMock()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchone.side_effect = [
+        value if isinstance(value, tuple) else (value,) for value in fetchone_values
+    ]
+    # Number of rows copied by each INSERT
+    cursor.execute.return_value = 5
+
+    # Act
+    progress = migrate_step(connection, partition_days=7, time_budget=time_budget)
+
+    # Assert
+    assert progress == expected_progress
+    queries = [c.args[0] for c in cursor.execute.call_args_list]
+    rename = (
+        "RENAME TABLE observation_logs TO observation_logs_unpartitioned,"
+        " observation_logs_partitioned TO observation_logs"
+    )
+    copies = [query for query in queries if "SELECT trial_name" in query]
+    if expected_progress is None:
+        # The start of the partitions is read from the primary key, not from a scan of time
+        assert "SELECT (SELECT time FROM observation_logs ORDER BY id LIMIT 1)" in queries
+        assert not any("MIN(time)" in query for query in queries)
+        assert any("PARTITION BY RANGE (TO_DAYS(time))" in query for query in queries)
+        # Rows are copied in batches until the swap
+        assert copies[0].endswith("LIMIT %s") and queries.index(copies[1]) > queries.index(rename)
+        assert rename in queries
+        deletes = [query for query in queries if query.startswith("DELETE migrated")]
+        assert len(deletes) == 1
+        assert queries[-2:] == [
+            "DROP TABLE observation_logs_unpartitioned",
+            "DROP TABLE observation_logs_migration",
+        ]
+    else:
+        assert rename not in queries
+        assert not copies
+
+
+def test_rotate_partitions():
+    """Test that upcoming partitions are split from pmax and expired partitions dropped."""
+    # Arrange
+    connection = MagicMock()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    boundaries = partition_boundaries(date(2026, 1, 1), date(2026, 1, 14), partition_days=7)
+    cursor.fetchall.return_value = [
+        (f"p{boundary:%Y%m%d}", str(_to_days(boundary))) for boundary in boundaries
+    ] + [("pmax", "MAXVALUE")]
+    now = datetime.combine(boundaries[-1], datetime.min.time(), timezone.utc)
+
+    # Act
+    dropped = rotate_partitions(connection, partition_days=7, retention=timedelta(days=7), now=now)
+
+    # Assert
+    # Partitions ending at least 7 days before now are dropped
+    assert dropped == [f"p{boundary:%Y%m%d}" for boundary in boundaries[:-1]]
+    reorganize, drop = [c.args[0] for c in cursor.execute.call_args_list[1:]]
+    upcoming = [boundaries[-1] + timedelta(days=7 * i) for i in (1, 2)]
+    assert reorganize == (
+        "ALTER TABLE observation_logs REORGANIZE PARTITION pmax INTO ("
+        + ", ".join(
+            f"PARTITION p{boundary:%Y%m%d} VALUES LESS THAN ({_to_days(boundary)})"
+            for boundary in upcoming
+        )
+        + ", PARTITION pmax VALUES LESS THAN MAXVALUE)"
+    )
+    assert drop == f"ALTER TABLE observation_logs DROP PARTITION {', '.join(dropped)}"
+
+
+def test_update_status_reports_partitioning_progress(
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_db_cursor,
+    mocker,
+):
+    """Test that the progress of the partitioning migration is shown in the unit status."""
+    # Arrange
+    harness.update_config({"observation-log-partitioning": True})
+    harness.begin()
+    mocker.patch.object(
+        harness.charm,
+        "_on_event",
+        side_effect=lambda event: setattr(harness.charm.unit, "status", ActiveStatus()),
+    )
+    mocker.patch("charm.is_migrated", return_value=False)
+    mocked_migrate_step = mocker.patch("charm.migrate_step", return_value=("copied", 0.42))
+
+    # Act
+    harness.charm.on.update_status.emit()
+
+    # Assert
+    assert mocked_migrate_step.call_args.args[1] == 7
+    assert harness.charm.unit.status == ActiveStatus("Partitioning observation_logs: 42% copied")
+
+
+def test_export_observation_logs_action(
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_db_cursor,
+    mocker,
+    tmp_path,
+):
+    """Test that the observation logs of an experiment are streamed to a gzipped CSV file."""
+    # Arrange
+    mocker.patch("observation_log_export.EXPORTS_DIR", tmp_path)
+    trials = [
+        Trial(
+            metadata=ObjectMeta(
+                name="trial-1", namespace="ns", labels={"katib.kubeflow.org/experiment": "exp"}
+            )
+        )
+    ]
+    mocked_lightkube_client.list.side_effect = lambda resource, **kwargs: (
+        trials if resource is Trial else []
+    )
+    mocked_db_cursor.__iter__.return_value = iter(
+        [
+            ("trial-1", "loss", datetime(2026, 1, 1, 0, 0, 0), "0.5"),
+            ("trial-1", "loss", datetime(2026, 1, 1, 0, 1, 0), "0.4"),
+        ]
+    )
+    harness.begin()
+
+    # Act
+    output = harness.run_action(
+        "export-observation-logs", {"namespace": "ns", "experiment": "exp"}
+    )
+
+    # Assert
+    assert mocked_lightkube_client.list.call_args.kwargs == {
+        "namespace": "ns",
+        "labels": {"katib.kubeflow.org/experiment": "exp"},
+    }
+    assert output.results["rows"] == 2
+    assert output.results["path"].startswith(str(tmp_path / "exp-"))
+    with gzip.open(output.results["path"], "rt", newline="") as export_file:
+        assert list(csv.reader(export_file)) == [
+            ["experiment", "trial_name", "metric_name", "time", "value"],
+            ["exp", "trial-1", "loss", "2026-01-01T00:00:00", "0.5"],
+            ["exp", "trial-1", "loss", "2026-01-01T00:01:00", "0.4"],
+        ]
+
+
+@pytest.mark.parametrize(
+    "endpoints,expected",
+    [
+        ("", []),
+        ("host:3306", [("host", "3306")]),
+        ("a:3306, b:3307", [("a", "3306"), ("b", "3307")]),
+        ("[::1]:3306", [("::1", "3306")]),
+    ],
+)
+def test_parse_endpoints(endpoints, expected):
+    """Test that comma-separated endpoints, including IPv6 ones, are parsed."""
+    assert parse_endpoints(endpoints) == expected
+
+
+@pytest.mark.parametrize("endpoints", ["host", "host:port", ":3306"])
+def test_parse_endpoints_invalid(endpoints):
+    """Test that endpoints without a valid port are rejected."""
+    with pytest.raises(ValueError):
+        parse_endpoints(endpoints)
+
+
+def test_relational_db_relation_multiple_endpoints(
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocker,
+):
+    """Test that the workload uses the first reachable endpoint, and the charm the replicas."""
+    # Arrange
+    mocker.patch("db_endpoints.is_reachable", side_effect=lambda endpoint: endpoint[0] != "a")
+    database = MagicMock()
+    database.fetch_relation_data.return_value = {
+        "test-db-data": {
+            "endpoints": "a:3306,b:3306,c:3306",
+            "read-only-endpoints": "r1:3306,r2:3306",
+            "username": "username",
+            "password": "password",
+        }
+    }
+    harness.model.get_relation = MagicMock(side_effect=_get_relation_db_only_side_effect_func)
+    harness.set_can_connect("katib-db-manager", True)
+    harness.begin()
+    harness.charm.database = database
+
+    # Act
+    harness.charm._db_data = harness.charm._get_db_data()
+    environment = harness.charm.service_environment
+
+    # Assert
+    assert environment["KATIB_MYSQL_DB_HOST"] == "b"
+    assert environment["KATIB_MYSQL_DB_PORT"] == "3306"
+    assert not [name for name in environment if name.endswith("ENDPOINTS")]
+    assert harness.charm._db_data["katib_db_read_only_endpoints"] == [
+        ("r1", "3306"),
+        ("r2", "3306"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "unreachable,expected_first",
+    [
+        (set(), ("c", "3306")),
+        ({"c"}, ("a", "3306")),
+        ({"a", "c"}, ("b", "3306")),
+    ],
+)
+def test_order_by_availability_keeps_current_endpoint(unreachable, expected_first, mocker):
+    """Test that the endpoint in use stays first while it is reachable, to avoid a restart."""
+    mocker.patch(
+        "db_endpoints.is_reachable", side_effect=lambda endpoint: endpoint[0] not in unreachable
+    )
+    endpoints = [("a", "3306"), ("b", "3306"), ("c", "3306")]
+
+    ordered = order_by_availability(endpoints, preferred=("c", "3306"))
+
+    assert ordered[0] == expected_first
+    assert sorted(ordered) == endpoints
+
+
+def test_secondary_endpoint_change_does_not_replan(
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_wait_for_database,
+    mocked_wait_until_reachable,
+    mocker,
+):
+    """Test that only a change of the endpoint in use restarts the workload."""
+    # Arrange
+    mocker.patch("db_endpoints.is_reachable", return_value=True)
+    relation_data = {
+        "endpoints": "a:3306,b:3306",
+        "read-only-endpoints": "r1:3306",
+        "username": "username",
+        "password": "password",
+    }
+    database = MagicMock()
+    database.fetch_relation_data.return_value = {"test-db-data": relation_data}
+    harness.model.get_relation = MagicMock(side_effect=_get_relation_db_only_side_effect_func)
+    harness.begin()
+    harness.charm.database = database
+    harness.container_pebble_ready("katib-db-manager")
+    assert mocked_wait_until_reachable.call_count == 1
+
+    # Act: the secondary and read-only endpoints change
+    relation_data.update({"endpoints": "c:3306,a:3306", "read-only-endpoints": "r2:3306"})
+    harness.charm.on.config_changed.emit()
+
+    # Assert
+    environment = (
+        harness.get_container_pebble_plan("katib-db-manager")
+        .services["katib-db-manager"]
+        .environment
+    )
+    assert environment["KATIB_MYSQL_DB_HOST"] == "a"
+    assert mocked_wait_until_reachable.call_count == 1
+
+    # Act: the endpoint in use is no longer advertised
+    relation_data["endpoints"] = "c:3306,b:3306"
+    harness.charm.on.config_changed.emit()
+
+    # Assert
+    environment = (
+        harness.get_container_pebble_plan("katib-db-manager")
+        .services["katib-db-manager"]
+        .environment
+    )
+    assert environment["KATIB_MYSQL_DB_HOST"] == "c"
+    assert mocked_wait_until_reachable.call_count == 2
+
+
+def test_workload_not_serving_after_replan(
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_wait_for_database,
+    mocked_wait_until_reachable,
+):
+    """Test that the unit waits for the restarted workload to accept connections."""
+    mocked_wait_until_reachable.return_value = False
+    database = MagicMock()
+    database.fetch_relation_data.return_value = {
+        "test-db-data": {"endpoints": "host:1234", "username": "username", "password": "password"}
+    }
+    harness.model.get_relation = MagicMock(side_effect=_get_relation_db_only_side_effect_func)
+    harness.begin()
+    harness.charm.database = database
+
+    harness.container_pebble_ready("katib-db-manager")
+
+    assert mocked_wait_until_reachable.call_args.args[0] == ("localhost", "6789")
+    assert harness.charm.model.unit.status == WaitingStatus(
+        "Waiting for katib-db-manager to accept connections"
+    )
+
+
+@pytest.mark.parametrize(
+    "connect_timeout,expected_command",
+    [("", "./katib-db-manager"), ("2m", "./katib-db-manager --connect-timeout=2m")],
+)
+def test_workload_command_connect_timeout(
+    connect_timeout,
+    expected_command,
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+):
+    """Test that the database connect timeout is passed as a flag of the workload."""
+    harness.update_config({"db-connect-timeout": connect_timeout})
+    harness.set_can_connect("katib-db-manager", True)
+    harness.begin()
+    harness.charm._db_data = DB_DATA
+
+    layer = harness.charm._katib_db_manager_layer
+
+    assert layer.services["katib-db-manager"].command == expected_command
+
+
+@pytest.mark.parametrize("metrics_port,expected_targets", [(0, []), (9090, ["*:9090"])])
+def test_metrics_endpoint_scrape_job(
+    metrics_port,
+    expected_targets,
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+):
+    """Test that the workload metrics port is published as a scrape job, with alert rules."""
+    harness.update_config({"metrics-port": metrics_port})
+    relation_id = harness.add_relation("metrics-endpoint", "prometheus")
+    harness.add_relation_unit(relation_id, "prometheus/0")
+    harness.begin()
+
+    harness.charm.on.config_changed.emit()
+
+    relation_data = harness.get_relation_data(relation_id, harness.charm.app.name)
+    scrape_jobs = json.loads(relation_data["scrape_jobs"])
+    assert [job["static_configs"][0]["targets"] for job in scrape_jobs] == [expected_targets]
+    alert_rules = json.loads(relation_data["alert_rules"])
+    alerts = {rule["alert"] for group in alert_rules["groups"] for rule in group["rules"]}
+    assert {"KatibDbManagerHighErrorRate", "KatibDbManagerHighLatency"} <= alerts
+
+
+@pytest.mark.parametrize(
+    "config,expected_error",
+    [
+        ({"health-check-period": "5s", "health-check-timeout": "1s"}, None),
+        ({"health-check-period": "5 seconds"}, "is not a Go duration"),
+        ({"health-check-period": "2s", "health-check-timeout": "2s"}, "must be shorter"),
+        ({"health-check-threshold": 0}, "must be positive"),
+        ({"shutdown-grace-period": "30"}, "is not a Go duration"),
+        ({"db-connect-timeout": "2 minutes"}, "Invalid db-connect-timeout"),
+    ],
+)
+def test_check_pebble_config(
+    config,
+    expected_error,
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+):
+    """Test that invalid health check settings block the unit instead of the Pebble layer."""
+    harness.update_config(config)
+    harness.begin()
+
+    if expected_error is None:
+        harness.charm._check_pebble_config()
+    else:
+        with pytest.raises(ErrorWithStatus) as error:
+            harness.charm._check_pebble_config()
+        assert expected_error in str(error.value)
+
+
+def test_wait_for_database_backoff(mocker):
+    """Test that the database is retried with exponential backoff until the timeout."""
+    mocked_check = mocker.patch(
+        "db_readiness.check_database", side_effect=pymysql.OperationalError(1045, "denied")
+    )
+    mocked_time = mocker.patch("db_readiness.time")
+    mocked_time.monotonic.side_effect = [0, 1, 3, 7, 17, 27, 31]
+
+    with pytest.raises(pymysql.OperationalError):
+        wait_for_database(DB_DATA, timeout=30)
+
+    assert [c.args[0] for c in mocked_time.sleep.call_args_list] == [1, 2, 4, 8, 3]
+    assert mocked_check.call_count == 6
+
+
+def test_database_not_ready_blocks_replan(
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_wait_for_database,
+    mocked_wait_until_reachable,
+):
+    """Test that the workload is not started until the database accepts connections."""
+    mocked_wait_for_database.side_effect = pymysql.OperationalError(1044, "access denied")
+    database = MagicMock()
+    database.fetch_relation_data.return_value = {
+        "test-db-data": {"endpoints": "host:1234", "username": "username", "password": "password"}
+    }
+    harness.model.get_relation = MagicMock(side_effect=_get_relation_db_only_side_effect_func)
+    harness.begin()
+    harness.charm.database = database
+
+    harness.container_pebble_ready("katib-db-manager")
+
+    assert mocked_wait_for_database.call_args.args[1] == 60
+    assert harness.charm.model.unit.status == WaitingStatus(
+        "Waiting for the database to accept connections"
+    )
+    assert not harness.get_container_pebble_plan("katib-db-manager").services
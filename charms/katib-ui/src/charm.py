@@ -22,6 +22,11 @@ from charms.kubeflow_dashboard.v0.kubeflow_dashboard_links import (
     KubeflowDashboardLinksRequirer,
 )
 from charms.loki_k8s.v1.loki_push_api import LogForwarder
+from charms.observability_libs.v0.kubernetes_compute_resources_patch import (
+    KubernetesComputeResourcesPatch,
+    ResourceRequirements,
+    adjust_resource_requirements,
+)
 from charms.observability_libs.v1.kubernetes_service_patch import KubernetesServicePatch
 from lightkube import ApiError
 from lightkube.generic_resource import load_in_cluster_generic_resources
@@ -32,6 +37,9 @@ from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus, WaitingSta
 from ops.pebble import Layer
 from serialized_data_interface import NoCompatibleVersions, NoVersionsListed, get_interfaces
 
+from go_runtime import go_runtime_environment
+from profiling import capture_profile
+
 HTTP_PATH = "/katib/"
 K8S_RESOURCE_FILES = ["src/templates/auth_manifests.yaml.j2"]
 ISTIO_INGRESS_ROUTE_RELATION = "istio-ingress-route"
@@ -63,6 +71,10 @@ class KatibUIOperator(CharmBase):
         self._port = self.model.config["port"]
         port = ServicePort(int(self._port), name=f"{self.app.name}")
         self.service_patcher = KubernetesServicePatch(self, [port])
+        # the StatefulSet is patched by the library, its status is checked in main
+        self.resources_patch = KubernetesComputeResourcesPatch(
+            self, self._container_name, resource_reqs_func=self._resource_requirements
+        )
         self._k8s_resource_handler = None
 
         self.ingress = IstioIngressRouteRequirer(
@@ -84,6 +96,7 @@ class KatibUIOperator(CharmBase):
             self.on.katib_ui_pebble_ready,
         ]:
             self.framework.observe(event, self.main)
+        self.framework.observe(self.on.capture_profile_action, self._on_capture_profile)
 
         # add link to notebook in kubeflow-dashboard sidebar
         self.kubeflow_dashboard_sidebar = KubeflowDashboardLinksRequirer(
@@ -134,6 +147,14 @@ class KatibUIOperator(CharmBase):
 
     @property
     def _katib_ui_layer(self) -> Layer:
+        environment = {"KATIB_CORE_NAMESPACE": self.model.name}
+        environment.update(
+            go_runtime_environment(
+                self.container,
+                gomaxprocs=int(self.model.config["gomaxprocs"]),
+                gomemlimit=self.model.config["gomemlimit"],
+            )
+        )
         layer_config = {
             "summary": "katib-ui-operator layer",
             "description": "pebble config layer for katib-ui-operator",
@@ -149,7 +170,7 @@ class KatibUIOperator(CharmBase):
                     # of "/app", which is used if working-dir is not set here.
                     "working-dir": "/app",
                     "startup": "enabled",
-                    "environment": {"KATIB_CORE_NAMESPACE": self.model.name},
+                    "environment": environment,
                 }
             },
         }
@@ -193,6 +214,26 @@ class KatibUIOperator(CharmBase):
             raise CheckFailed("kubernetes resource creation failed", BlockedStatus)
         self.model.unit.status = ActiveStatus()
 
+    def _resource_requirements(self) -> ResourceRequirements:
+        """Return the workload container resources from the cpu-* and memory-* config options."""
+        limits = {
+            resource: self.model.config[f"{resource}-limit"]
+            for resource in ("cpu", "memory")
+            if self.model.config[f"{resource}-limit"]
+        }
+        requests = {
+            resource: self.model.config[f"{resource}-request"]
+            for resource in ("cpu", "memory")
+            if self.model.config[f"{resource}-request"]
+        }
+        return adjust_resource_requirements(limits, requests, adhere_to_requests=True)
+
+    def _check_resources_patched(self) -> None:
+        """Raise CheckFailed if this unit's pod does not run with the configured resources yet."""
+        status = self.resources_patch.get_status()
+        if not isinstance(status, ActiveStatus):
+            raise CheckFailed(status.message, type(status))
+
     def _get_interfaces(self):
         try:
             interfaces = get_interfaces(self)
@@ -236,6 +277,24 @@ class KatibUIOperator(CharmBase):
                 BlockedStatus,
             )
 
+    def _on_capture_profile(self, event) -> None:
+        """Capture a pprof profile from the workload and return the path it was written to."""
+        port = int(self.model.config["profiling-port"])
+        if not port:
+            event.fail("Profiling is disabled, set the profiling-port config option to enable it.")
+            return
+        try:
+            path = capture_profile(
+                port,
+                profile=event.params["profile"],
+                duration=int(event.params["duration"]),
+                name=self.app.name,
+            )
+        except (OSError, ValueError) as err:
+            event.fail(f"Failed to capture profile: {err}")
+            return
+        event.set_results({"path": str(path), "size": path.stat().st_size})
+
     def main(self, _) -> None:
         """Main entry point for the Charm."""
         try:
@@ -246,6 +305,7 @@ class KatibUIOperator(CharmBase):
             self._handle_ingress(interfaces)
             self._deploy_k8s_resources()
             update_layer(self._container_name, self.container, self._katib_ui_layer, self.logger)
+            self._check_resources_patched()
         except CheckFailed as e:
             self.model.unit.status = e.status
             return
@@ -0,0 +1,59 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Capture Go pprof profiles from the workload's profiling endpoint."""
+
+import logging
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.request import urlopen
+
+logger = logging.getLogger(__name__)
+
+# The charm and workload containers share the pod network namespace, so an endpoint bound to
+# localhost in the workload container is reachable from the charm container
+PPROF_URL = "http://localhost:{port}/debug/pprof/{path}"
+PROFILES_DIR = Path("/tmp/profiles")
+# Profiles captured over a window with ?seconds=; the others are point-in-time snapshots
+DURATION_PROFILES = {"cpu": "profile", "heap": "heap", "mutex": "mutex"}
+SNAPSHOT_PROFILES = {"goroutine": "goroutine"}
+PROFILES = {**DURATION_PROFILES, **SNAPSHOT_PROFILES}
+# Extra time allowed for the endpoint to answer after the capture window
+REQUEST_TIMEOUT_MARGIN = 30
+
+
+def capture_profile(
+    port: int, profile: str, duration: int, name: str, profiles_dir: Optional[Path] = None
+) -> Path:
+    """Capture a pprof profile and write it to a file in the charm container.
+
+    Args:
+        port: port of the pprof endpoint, bound to localhost in the workload container.
+        profile: one of cpu, heap, goroutine or mutex.
+        duration: capture window in seconds, for cpu, heap and mutex profiles.
+        name: name of the workload, used as prefix of the profile file.
+        profiles_dir: directory the profile is written to, PROFILES_DIR by default.
+
+    Returns:
+        The path of the profile file.
+
+    Raises:
+        ValueError: if the profile type is not supported.
+        OSError: if the endpoint cannot be reached or the file cannot be written.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unsupported profile '{profile}', expected one of {sorted(PROFILES)}")
+
+    path = PROFILES[profile]
+    if profile in DURATION_PROFILES:
+        path = f"{path}?seconds={duration}"
+    url = PPROF_URL.format(port=port, path=path)
+
+    profiles_dir = profiles_dir or PROFILES_DIR
+    profiles_dir.mkdir(parents=True, exist_ok=True)
+    destination = profiles_dir / f"{name}-{profile}-{time.strftime('%Y%m%d%H%M%S')}.pb.gz"
+
+    logger.info(f"Capturing {profile} profile from {url} to {destination}")
+    with urlopen(url, timeout=duration + REQUEST_TIMEOUT_MARGIN) as response:
+        destination.write_bytes(response.read())
+    return destination
@@ -6,7 +6,7 @@ from unittest.mock import MagicMock, patch
 import pytest
 from charms.istio_ingress_k8s.v0.istio_ingress_route import ProtocolType
 from ops.model import ActiveStatus, BlockedStatus, WaitingStatus
-from ops.testing import Harness
+from ops.testing import ActionFailed, Harness
 
 from charm import KatibUIOperator
 
@@ -95,6 +95,14 @@ def mocked_load_in_cluster_generic_resources(mocker):
     yield mocked_load
 
 
+@pytest.fixture(autouse=True)
+def mocked_compute_resources_patch(mocker):
+    """Mocks the KubernetesComputeResourcesPatch for the charm, which patches the StatefulSet."""
+    mocked_compute_resources_patch = mocker.patch("charm.KubernetesComputeResourcesPatch")
+    mocked_compute_resources_patch.return_value.get_status.return_value = ActiveStatus()
+    yield mocked_compute_resources_patch
+
+
 def test_log_forwarding(
     harness,
     mocked_resource_handler,
@@ -326,3 +334,97 @@ def test_config_changed_event(
     # Assert
     mocked_resource_handler.apply.assert_called()
     assert isinstance(harness.charm.model.unit.status, ActiveStatus)
+
+
+@pytest.mark.parametrize(
+    "cgroup_files,config,expected_environment",
+    [
+        (
+            {"/sys/fs/cgroup/cpu.max": "300000 100000", "/sys/fs/cgroup/memory.max": "3000"},
+            {},
+            {"GOMAXPROCS": "3", "GOMEMLIMIT": "2700"},
+        ),
+        ({"/sys/fs/cgroup/cpu.max": "max 100000", "/sys/fs/cgroup/memory.max": "max"}, {}, {}),
+        (
+            {"/sys/fs/cgroup/memory.max": "3000"},
+            {"gomaxprocs": 2, "gomemlimit": "off"},
+            {"GOMAXPROCS": "2", "GOMEMLIMIT": "off"},
+        ),
+    ],
+)
+def test_pebble_layer_go_runtime_environment(
+    cgroup_files,
+    config,
+    expected_environment,
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_istio_ingress_route_requirer,
+    mocked_service_mesh_consumer,
+    mocked_kubeflow_dashboard_links_requirer,
+):
+    """Test that GOMAXPROCS and GOMEMLIMIT are derived from cgroup limits or config."""
+    harness.update_config(config)
+    harness.set_can_connect("katib-ui", True)
+    harness.begin()
+    for path, content in cgroup_files.items():
+        harness.charm.container.push(path, content, make_dirs=True)
+
+    environment = harness.charm._katib_ui_layer.services["katib-ui"].environment
+
+    for variable in ["GOMAXPROCS", "GOMEMLIMIT"]:
+        assert environment.get(variable) == expected_environment.get(variable)
+
+
+@pytest.mark.parametrize(
+    "patch_status",
+    [
+        ActiveStatus(),
+        WaitingStatus("Waiting for resource limit patch to apply"),
+        BlockedStatus("Failed to apply resource limit patch"),
+    ],
+)
+def test_resources_patch(
+    patch_status,
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_istio_ingress_route_requirer,
+    mocked_service_mesh_consumer,
+    mocked_kubeflow_dashboard_links_requirer,
+    mocked_load_in_cluster_generic_resources,
+    mocked_compute_resources_patch,
+):
+    """Test that the resources patch gets the configured resources and sets the unit status."""
+    mocked_compute_resources_patch.return_value.get_status.return_value = patch_status
+    harness.update_config({"cpu-limit": "500m", "memory-request": "64Mi"})
+    harness.begin_with_initial_hooks()
+
+    harness.charm.on.config_changed.emit()
+
+    resource_reqs_func = mocked_compute_resources_patch.call_args.kwargs["resource_reqs_func"]
+    resource_requirements = resource_reqs_func()
+    assert mocked_compute_resources_patch.call_args.args[1] == "katib-ui"
+    assert resource_requirements.limits["cpu"] == "0.5"
+    assert resource_requirements.requests["memory"] == "64Mi"
+    assert harness.charm.model.unit.status == patch_status
+
+
+def test_capture_profile_action_disabled(
+    harness,
+    mocked_resource_handler,
+    mocked_lightkube_client,
+    mocked_kubernetes_service_patcher,
+    mocked_istio_ingress_route_requirer,
+    mocked_service_mesh_consumer,
+    mocked_kubeflow_dashboard_links_requirer,
+):
+    """Test that the capture-profile action fails when profiling-port is not set."""
+    harness.begin()
+
+    with pytest.raises(ActionFailed) as err:
+        harness.run_action("capture-profile", {"profile": "goroutine"})
+
+    assert "Profiling is disabled" in err.value.message